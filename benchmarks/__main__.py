@@ -0,0 +1,230 @@
+"""
+Benchmarks for the query hot paths.
+
+    python -m benchmarks --url postgresql://localhost/benchmarks --output results.json
+
+Runs against a temporary SQLite database when no URLs are given, either with
+`--url` or as a comma separated `BENCHMARK_DATABASE_URLS`. Results are written
+as JSON, to stdout unless `--output` is given, with a summary on stderr.
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import typing
+
+import sqlalchemy
+
+import databases
+from benchmarks.cases import (
+    BENCHMARKS,
+    STYLES,
+    Benchmark,
+    items,
+    make_row,
+    metadata,
+    writes,
+)
+from databases import Database, DatabaseURL
+
+
+def get_sync_url(url: str) -> str:
+    database_url = DatabaseURL(url)
+    if database_url.dialect == "mysql":
+        return str(database_url.replace(driver="pymysql"))
+    return url
+
+
+def percentile(timings: typing.List[float], percent: float) -> float:
+    index = max(int(len(timings) * percent / 100 + 0.5), 1) - 1
+    return timings[min(index, len(timings) - 1)]
+
+
+async def run_benchmark(
+    database: Database,
+    benchmark: Benchmark,
+    style: str,
+    rows: int,
+    table_rows: int,
+    concurrency: int,
+    iterations: int,
+) -> dict:
+    operation = benchmark.factory(style, rows, table_rows)
+    per_worker = max(iterations // concurrency, 1)
+    timings = []  # type: typing.List[float]
+    total_rows = 0
+
+    async def worker() -> None:
+        nonlocal total_rows
+        # Each worker runs in its own task, and so on its own connection.
+        for _ in range(per_worker):
+            started = time.perf_counter()
+            count = await operation(database)
+            timings.append(time.perf_counter() - started)
+            total_rows += count
+
+    # Warm up the connection pool and statement caches.
+    await asyncio.gather(*[operation(database) for _ in range(concurrency)])
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    if benchmark.writes:
+        await database.execute(writes.delete())
+
+    timings.sort()
+    return {
+        "benchmark": benchmark.name,
+        "style": style,
+        "dialect": DatabaseURL(str(database.url)).dialect,
+        "rows": rows,
+        "concurrency": concurrency,
+        "operations": len(timings),
+        "elapsed": elapsed,
+        "ops_per_sec": len(timings) / elapsed,
+        "rows_per_sec": total_rows / elapsed,
+        "latency_mean": sum(timings) / len(timings),
+        "latency_p50": percentile(timings, 50),
+        "latency_p99": percentile(timings, 99),
+    }
+
+
+async def run_url(url: str, args: argparse.Namespace) -> typing.List[dict]:
+    table_rows = max(args.rows)
+    engine = sqlalchemy.create_engine(get_sync_url(url))
+    metadata.drop_all(engine)
+    metadata.create_all(engine)
+
+    results = []
+    try:
+        async with Database(url) as database:
+            # Connections are task-local, and tasks inherit them from the task
+            # that creates them. Each step runs in its own task, so that the
+            # benchmark's workers get a connection each.
+            await asyncio.ensure_future(
+                database.execute_many(
+                    items.insert(), [make_row(idx) for idx in range(table_rows)]
+                )
+            )
+            for name in args.benchmark:
+                benchmark = BENCHMARKS[name]
+                row_counts = args.rows if benchmark.scales_with_rows else [1]
+                for style in STYLES:
+                    for rows in row_counts:
+                        for concurrency in args.concurrency:
+                            result = await asyncio.ensure_future(
+                                run_benchmark(
+                                    database,
+                                    benchmark,
+                                    style,
+                                    rows,
+                                    table_rows,
+                                    concurrency,
+                                    args.iterations,
+                                )
+                            )
+                            print(format_result(result), file=sys.stderr)
+                            results.append(result)
+    finally:
+        metadata.drop_all(engine)
+    return results
+
+
+def format_result(result: dict) -> str:
+    return (
+        "{dialect:<10} {benchmark:<20} {style:<4} rows={rows:<6} "
+        "concurrency={concurrency:<3} {ops_per_sec:>10.1f} ops/s "
+        "{rows_per_sec:>12.1f} rows/s  p50={latency_p50_us:.1f}us "
+        "p99={latency_p99_us:.1f}us"
+    ).format(
+        latency_p50_us=result["latency_p50"] * 1e6,
+        latency_p99_us=result["latency_p99"] * 1e6,
+        **result,
+    )
+
+
+def parse_ints(value: str) -> typing.List[int]:
+    return [int(item) for item in value.split(",")]
+
+
+def parse_args(argv: typing.List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument(
+        "--url",
+        action="append",
+        help="A database URL to benchmark. May be given more than once.",
+    )
+    parser.add_argument(
+        "--benchmark",
+        action="append",
+        choices=sorted(BENCHMARKS),
+        help="A benchmark to run. Defaults to all of them.",
+    )
+    parser.add_argument(
+        "--rows",
+        type=parse_ints,
+        default=[10, 1000],
+        help="Comma separated row counts, for the benchmarks that scale with rows.",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=parse_ints,
+        default=[1, 8],
+        help="Comma separated numbers of concurrent tasks.",
+    )
+    parser.add_argument(
+        "--iterations",
+        type=int,
+        default=200,
+        help="The number of operations to time for each configuration.",
+    )
+    parser.add_argument("--output", help="Write the JSON results to this file.")
+    args = parser.parse_args(argv)
+    if args.benchmark is None:
+        args.benchmark = list(BENCHMARKS)
+    return args
+
+
+def main(argv: typing.List[str]) -> None:
+    args = parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        urls = args.url
+        if not urls and os.environ.get("BENCHMARK_DATABASE_URLS"):
+            urls = os.environ["BENCHMARK_DATABASE_URLS"].split(",")
+        if not urls:
+            urls = ["sqlite:///" + os.path.join(tmpdir, "benchmarks.db")]
+
+        loop = asyncio.get_event_loop()
+        results = []
+        for url in urls:
+            results.extend(loop.run_until_complete(run_url(url.strip(), args)))
+
+    output = {
+        "meta": {
+            "timestamp": datetime.datetime.utcnow().isoformat() + "Z",
+            "databases": databases.__version__,
+            "sqlalchemy": sqlalchemy.__version__,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+        },
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(output, output_file, indent=2)
+    else:
+        json.dump(output, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,226 @@
+"""
+The benchmarked operations, each run with either SQLAlchemy core or raw
+string queries.
+"""
+
+import random
+import typing
+
+import sqlalchemy
+
+from databases import Database
+
+metadata = sqlalchemy.MetaData()
+
+items = sqlalchemy.Table(
+    "benchmark_items",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("name", sqlalchemy.String(length=100)),
+    sqlalchemy.Column("value", sqlalchemy.Integer),
+    sqlalchemy.Column("completed", sqlalchemy.Boolean),
+)
+
+# Written to by the write benchmarks, so that the rows read stay the same.
+writes = sqlalchemy.Table(
+    "benchmark_writes",
+    metadata,
+    sqlalchemy.Column("id", sqlalchemy.Integer, primary_key=True),
+    sqlalchemy.Column("name", sqlalchemy.String(length=100)),
+    sqlalchemy.Column("value", sqlalchemy.Integer),
+    sqlalchemy.Column("completed", sqlalchemy.Boolean),
+)
+
+STYLES = ("core", "raw")
+
+# An operation returns the number of rows that it read or wrote.
+Operation = typing.Callable[[Database], typing.Awaitable[int]]
+
+
+class Benchmark:
+    def __init__(
+        self,
+        name: str,
+        factory: typing.Callable[[str, int, int], Operation],
+        scales_with_rows: bool,
+        writes: bool,
+    ) -> None:
+        self.name = name
+        self.factory = factory
+        self.scales_with_rows = scales_with_rows
+        self.writes = writes
+
+
+BENCHMARKS = {}  # type: typing.Dict[str, Benchmark]
+
+
+def benchmark(
+    name: str, *, scales_with_rows: bool = False, writes: bool = False
+) -> typing.Callable:
+    """
+    Register a factory, called with the query style, the number of rows per
+    operation and the number of rows in the table, that returns an operation.
+    """
+
+    def register(factory: typing.Callable) -> typing.Callable:
+        BENCHMARKS[name] = Benchmark(name, factory, scales_with_rows, writes)
+        return factory
+
+    return register
+
+
+def make_row(idx: int) -> dict:
+    return {"name": "item%d" % idx, "value": idx, "completed": idx % 2 == 0}
+
+
+def select_many(style: str, rows: int) -> typing.Tuple[typing.Any, dict]:
+    if style == "core":
+        return items.select().order_by(items.c.id).limit(rows), {}
+    query = (
+        "SELECT id, name, value, completed FROM benchmark_items ORDER BY id LIMIT :rows"
+    )
+    return query, {"rows": rows}
+
+
+def select_by_id(style: str) -> typing.Any:
+    if style == "core":
+        return items.select().where(items.c.id == sqlalchemy.bindparam("id"))
+    return "SELECT id, name, value, completed FROM benchmark_items WHERE id = :id"
+
+
+def select_value_by_id(style: str) -> typing.Any:
+    if style == "core":
+        query = sqlalchemy.select([items.c.value])
+        return query.where(items.c.id == sqlalchemy.bindparam("id"))
+    return "SELECT value FROM benchmark_items WHERE id = :id"
+
+
+def insert(style: str) -> typing.Any:
+    if style == "core":
+        return writes.insert()
+    return (
+        "INSERT INTO benchmark_writes (name, value, completed) "
+        "VALUES (:name, :value, :completed)"
+    )
+
+
+@benchmark("fetch_all", scales_with_rows=True)
+def fetch_all(style: str, rows: int, table_rows: int) -> Operation:
+    query, values = select_many(style, rows)
+
+    async def operation(database: Database) -> int:
+        return len(await database.fetch_all(query, values))
+
+    return operation
+
+
+@benchmark("fetch_one")
+def fetch_one(style: str, rows: int, table_rows: int) -> Operation:
+    query = select_by_id(style)
+
+    async def operation(database: Database) -> int:
+        values = {"id": random.randint(1, table_rows)}
+        return 0 if await database.fetch_one(query, values) is None else 1
+
+    return operation
+
+
+@benchmark("fetch_one_driver")
+def fetch_one_driver(style: str, rows: int, table_rows: int) -> Operation:
+    """
+    The same query as `fetch_one`, compiled once and then run straight
+    through the driver, as a baseline for the library's per-query overhead.
+    """
+    query = select_by_id(style)
+    sql = None  # type: typing.Optional[str]
+
+    async def operation(database: Database) -> int:
+        nonlocal sql
+        value = random.randint(1, table_rows)
+        connection = database._backend.connection()
+        await connection.acquire()
+        try:
+            if sql is None:
+                sql, _ = connection.compile(query, {"id": value})
+            row = await fetch_driver_row(
+                database.url.dialect, connection.raw_connection, sql, value
+            )
+        finally:
+            await connection.release()
+        return 0 if row is None else 1
+
+    return operation
+
+
+async def fetch_driver_row(
+    dialect: str, raw_connection: typing.Any, sql: str, value: int
+) -> typing.Any:
+    if dialect == "postgresql":
+        return await raw_connection.fetchrow(sql, value)
+    elif dialect == "mysql":
+        async with raw_connection.cursor() as cursor:
+            await cursor.execute(sql, {"id": value})
+            return await cursor.fetchone()
+    async with raw_connection.execute(sql, [value]) as cursor:
+        return await cursor.fetchone()
+
+
+@benchmark("fetch_val")
+def fetch_val(style: str, rows: int, table_rows: int) -> Operation:
+    query = select_value_by_id(style)
+
+    async def operation(database: Database) -> int:
+        values = {"id": random.randint(1, table_rows)}
+        return 0 if await database.fetch_val(query, values) is None else 1
+
+    return operation
+
+
+@benchmark("iterate", scales_with_rows=True)
+def iterate(style: str, rows: int, table_rows: int) -> Operation:
+    query, values = select_many(style, rows)
+
+    async def operation(database: Database) -> int:
+        count = 0
+        async for _ in database.iterate(query, values):
+            count += 1
+        return count
+
+    return operation
+
+
+@benchmark("execute", writes=True)
+def execute(style: str, rows: int, table_rows: int) -> Operation:
+    query = insert(style)
+
+    async def operation(database: Database) -> int:
+        await database.execute(query, make_row(random.randint(1, table_rows)))
+        return 1
+
+    return operation
+
+
+@benchmark("execute_many", scales_with_rows=True, writes=True)
+def execute_many(style: str, rows: int, table_rows: int) -> Operation:
+    query = insert(style)
+    values = [make_row(idx) for idx in range(rows)]
+
+    async def operation(database: Database) -> int:
+        await database.execute_many(query, values)
+        return rows
+
+    return operation
+
+
+@benchmark("nested_transaction")
+def nested_transaction(style: str, rows: int, table_rows: int) -> Operation:
+    query = select_value_by_id(style)
+
+    async def operation(database: Database) -> int:
+        async with database.transaction():
+            async with database.transaction():
+                values = {"id": random.randint(1, table_rows)}
+                await database.fetch_val(query, values)
+        return 1
+
+    return operation
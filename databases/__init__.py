@@ -1,4 +1,7 @@
+from databases.cache import ResultCache
 from databases.core import Database, DatabaseURL
+from databases.rows import Row
+from databases.slow_queries import SlowQueryLog
 
 __version__ = "0.2.5"
-__all__ = ["Database", "DatabaseURL"]
+__all__ = ["Database", "DatabaseURL", "ResultCache", "Row", "SlowQueryLog"]
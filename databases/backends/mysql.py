@@ -1,30 +1,47 @@
 import getpass
 import logging
+import re
 import typing
 import uuid
 
 import aiomysql
 from sqlalchemy.dialects.mysql import pymysql
-from sqlalchemy.engine.interfaces import Dialect, ExecutionContext
+from sqlalchemy.engine.interfaces import Compiled, Dialect, ExecutionContext
 from sqlalchemy.engine.result import ResultMetaData, RowProxy
 from sqlalchemy.sql import ClauseElement
 from sqlalchemy.types import TypeEngine
 
+from databases.cache import CompiledCache, compile_clause
+from databases.columns import transpose
 from databases.core import DatabaseURL
 from databases.interfaces import ConnectionBackend, DatabaseBackend, TransactionBackend
+from databases.raw_sql import ParsedSQL, check_values, get_value, process_value
+from databases.rows import RowType, make_rows
+from databases.slow_queries import READ_QUERY_RE
+from databases.stats import AcquireStats
 
 logger = logging.getLogger("databases")
 
+# The number of rows fetched at a time by `iterate()`.
+ITERATE_BATCH_SIZE = 100
+
+# The first MySQL version to support `EXPLAIN ANALYZE`.
+EXPLAIN_ANALYZE_VERSION = (8, 0, 18)
+VERSION_RE = re.compile(r"(\d+)\.(\d+)\.(\d+)")
+
 
 class MySQLBackend(DatabaseBackend):
     def __init__(
         self, database_url: typing.Union[DatabaseURL, str], **options: typing.Any
     ) -> None:
         self._database_url = DatabaseURL(database_url)
+        self.compiled_cache = CompiledCache(options.pop("compiled_cache_size", 500))
+        self.acquire_stats = AcquireStats()
         self._options = options
         self._dialect = pymysql.dialect(paramstyle="pyformat")
         self._dialect.supports_native_decimal = True
         self._pool = None
+        self._max_allowed_packet = None  # type: typing.Optional[int]
 
     def _get_connection_kwargs(self) -> dict:
         url_options = self._database_url.options
@@ -73,12 +90,110 @@ class MySQLBackend(DatabaseBackend):
     def connection(self) -> "MySQLConnection":
         return MySQLConnection(self, self._dialect)
 
+    def pool_stats(self) -> typing.Dict[str, typing.Any]:
+        pool = self._pool
+        if pool is None:
+            size = idle = min_size = max_size = 0
+        else:
+            size, idle = pool.size, pool.freesize
+            min_size, max_size = pool.minsize, pool.maxsize
+        return {
+            "size": size,
+            "min_size": min_size,
+            "max_size": max_size,
+            "idle": idle,
+            "in_use": size - idle,
+            **self.acquire_stats.get_stats(),
+        }
+
+    def get_compiled(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> "CompiledQuery":
+        return self.connection()._get_compiled(query, values)
+
+    def prepare(
+        self, query: typing.Union[ClauseElement, str], column_keys: list = None
+    ) -> "CompiledQuery":
+        if isinstance(query, str):
+            return RawQuery(query, self._dialect)
+        compiled = compile_clause(query, self._dialect, column_keys)
+        return CompiledQuery(compiled, self._dialect)
+
 
 class CompilationContext:
     def __init__(self, context: ExecutionContext):
         self.context = context
 
 
+def get_compilation_context(
+    dialect: Dialect, result_column_struct: tuple
+) -> CompilationContext:
+    execution_context = dialect.execution_ctx_cls()
+    execution_context.dialect = dialect
+    execution_context.result_column_struct = result_column_struct
+    return CompilationContext(execution_context)
+
+
+class CompiledQuery:
+    def __init__(self, compiled: Compiled, dialect: Dialect) -> None:
+        self.compiled = compiled
+        self.query = compiled.string
+        self.processors = compiled._bind_processors
+
+        self.context = get_compilation_context(
+            dialect,
+            (
+                compiled._result_columns,
+                compiled._ordered_columns,
+                compiled._textual_ordered_columns,
+            ),
+        )
+        self._description = None  # type: typing.Optional[tuple]
+        self._metadata = None  # type: typing.Optional[ResultMetaData]
+
+    def get_metadata(self, description: tuple) -> ResultMetaData:
+        # The result metadata is reused for as long as the statement keeps
+        # returning the same columns.
+        if description != self._description:
+            self._metadata = ResultMetaData(self.context, description)
+            self._description = description
+        return self._metadata
+
+    def get_args(self, values: typing.Optional[dict]) -> dict:
+        args = self.compiled.construct_params(values)
+        for key, processor in self.processors.items():
+            if key in args:
+                args[key] = processor(args[key])
+        return args
+
+
+class RawQuery(CompiledQuery):
+    """
+    A raw SQL query, with its `:name` placeholders rewritten as `%(name)s`
+    directly rather than by compiling a `text()` construct.
+    """
+
+    def __init__(self, sql: str, dialect: Dialect) -> None:
+        parsed = ParsedSQL(sql)
+        # The driver interpolates the arguments with `%`, so literal percent
+        # signs need escaping.
+        parsed.chunks = [chunk.replace("%", "%%") for chunk in parsed.chunks]
+        self.query = parsed.render(lambda idx, name: "%(" + name + ")s")
+        self.names = list(dict.fromkeys(parsed.names))
+        self.name_set = parsed.name_set
+        self.dialect = dialect
+        self.context = get_compilation_context(dialect, ([], False, False))
+        self._description = None
+        self._metadata = None
+
+    def get_args(self, values: typing.Optional[dict]) -> dict:
+        check_values(values, self.name_set)
+        dialect = self.dialect
+        return {
+            name: process_value(dialect, get_value(values, name)) for name in self.names
+        }
+
+
 class MySQLConnection(ConnectionBackend):
     def __init__(self, database: MySQLBackend, dialect: Dialect):
         self._database = database
@@ -88,7 +203,8 @@ class MySQLConnection(ConnectionBackend):
     async def acquire(self) -> None:
         assert self._connection is None, "Connection is already acquired"
         assert self._database._pool is not None, "DatabaseBackend is not running"
-        self._connection = await self._database._pool.acquire()
+        with self._database.acquire_stats.timer():
+            self._connection = await self._database._pool.acquire()
 
     async def release(self) -> None:
         assert self._connection is not None, "Connection is not acquired"
@@ -96,14 +212,21 @@ class MySQLConnection(ConnectionBackend):
         await self._database._pool.release(self._connection)
         self._connection = None
 
-    async def fetch_all(self, query: ClauseElement) -> typing.List[typing.Mapping]:
+    async def fetch_all(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        row_type: RowType = "record",
+    ) -> typing.List[typing.Any]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, context = self._compile(query)
+        query, args, compiled = self._compile(query, values)
         cursor = await self._connection.cursor()
         try:
             await cursor.execute(query, args)
             rows = await cursor.fetchall()
-            metadata = ResultMetaData(context, cursor.description)
+            metadata = compiled.get_metadata(cursor.description)
+            if row_type != "record":
+                return make_rows(rows, metadata._processors, row_type, metadata.keys)
             return [
                 RowProxy(metadata, row, metadata._processors, metadata._keymap)
                 for row in rows
@@ -111,23 +234,52 @@ class MySQLConnection(ConnectionBackend):
         finally:
             await cursor.close()
 
-    async def fetch_one(self, query: ClauseElement) -> typing.Optional[typing.Mapping]:
+    async def fetch_one(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        row_type: RowType = "record",
+    ) -> typing.Optional[typing.Any]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, context = self._compile(query)
+        query, args, compiled = self._compile(query, values)
         cursor = await self._connection.cursor()
         try:
             await cursor.execute(query, args)
             row = await cursor.fetchone()
             if row is None:
                 return None
-            metadata = ResultMetaData(context, cursor.description)
+            metadata = compiled.get_metadata(cursor.description)
+            if row_type != "record":
+                return make_rows([row], metadata._processors, row_type, metadata.keys)[
+                    0
+                ]
             return RowProxy(metadata, row, metadata._processors, metadata._keymap)
         finally:
             await cursor.close()
 
-    async def execute(self, query: ClauseElement) -> typing.Any:
+    async def fetch_columns(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Dict[str, list]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, context = self._compile(query)
+        query, args, compiled = self._compile(query, values)
+        cursor = await self._connection.cursor()
+        try:
+            await cursor.execute(query, args)
+            rows = await cursor.fetchall()
+            description = cursor.description
+        finally:
+            await cursor.close()
+        if description is None:
+            return {}
+        metadata = compiled.get_metadata(description)
+        names = [column[0] for column in description]
+        return dict(zip(names, transpose(rows, metadata._processors)))
+
+    async def execute(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Any:
+        assert self._connection is not None, "Connection is not acquired"
+        query, args, compiled = self._compile(query, values)
         cursor = await self._connection.cursor()
         try:
             await cursor.execute(query, args)
@@ -135,52 +287,168 @@ class MySQLConnection(ConnectionBackend):
         finally:
             await cursor.close()
 
-    async def execute_many(self, queries: typing.List[ClauseElement]) -> None:
+    async def execute_many(
+        self, query: typing.Union[ClauseElement, str], values: list
+    ) -> None:
         assert self._connection is not None, "Connection is not acquired"
         cursor = await self._connection.cursor()
         try:
-            for single_query in queries:
-                single_query, args, context = self._compile(single_query)
-                await cursor.execute(single_query, args)
+            # aiomysql's `executemany` rewrites INSERT statements into
+            # multi-row `INSERT ... VALUES (...), (...)` statements, and falls
+            # back to executing row by row for anything else.
+            cursor.max_stmt_length = await self._get_max_stmt_length(cursor)
+            batch_query = None  # type: typing.Optional[CompiledQuery]
+            batch = []  # type: typing.List[dict]
+            for values_set in values:
+                compiled = self._get_compiled(query, values_set, reused=True)
+                if batch and compiled is not batch_query:
+                    await self._execute_batch(cursor, batch_query, batch)
+                    batch = []
+                batch_query = compiled
+                batch.append(compiled.get_args(values_set))
+            if batch:
+                await self._execute_batch(cursor, batch_query, batch)
         finally:
             await cursor.close()
 
-    async def iterate(
-        self, query: ClauseElement
-    ) -> typing.AsyncGenerator[typing.Any, None]:
+    async def iterate_batches(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        size: int = None,
+        row_type: RowType = "record",
+    ) -> typing.AsyncGenerator[typing.List[typing.Any], None]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, context = self._compile(query)
-        cursor = await self._connection.cursor()
+        query, args, compiled = self._compile(query, values)
+        if size is None:
+            size = ITERATE_BATCH_SIZE
+        # An unbuffered cursor streams rows from the server as they're
+        # fetched, rather than reading the whole result set up front.
+        cursor = await self._connection.cursor(aiomysql.SSCursor)
         try:
             await cursor.execute(query, args)
-            metadata = ResultMetaData(context, cursor.description)
-            async for row in cursor:
-                yield RowProxy(metadata, row, metadata._processors, metadata._keymap)
+            metadata = compiled.get_metadata(cursor.description)
+            while True:
+                rows = await cursor.fetchmany(size)
+                if not rows:
+                    break
+                if row_type != "record":
+                    yield make_rows(rows, metadata._processors, row_type, metadata.keys)
+                else:
+                    yield [
+                        RowProxy(metadata, row, metadata._processors, metadata._keymap)
+                        for row in rows
+                    ]
+        finally:
+            # Closing the cursor drains any unread rows, so that the
+            # connection can be reused. If that fails, the connection is
+            # closed so that the pool discards it rather than reusing it
+            # mid-result.
+            try:
+                await cursor.close()
+            except BaseException:
+                self._connection.close()
+                raise
+
+    async def explain(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        analyze: bool = False,
+    ) -> typing.List[str]:
+        assert self._connection is not None, "Connection is not acquired"
+        query, args, compiled = self._compile(query, values)
+        prefix = self._get_explain_prefix(query, analyze)
+        cursor = await self._connection.cursor()
+        try:
+            await cursor.execute(prefix + query, args)
+            rows = await cursor.fetchall()
         finally:
             await cursor.close()
+        if prefix == "EXPLAIN ANALYZE ":
+            # The plan is returned as a single tree of text.
+            return [line for row in rows for line in row[0].splitlines()]
+        return ["\t".join(str(value) for value in row) for row in rows]
+
+    def compile(
+        self, query: typing.Union[ClauseElement, str], values: typing.Any = None
+    ) -> typing.Tuple[str, typing.Any]:
+        query, args, compiled = self._compile(query, values)
+        return query, args
 
     def transaction(self) -> TransactionBackend:
         return MySQLTransaction(self)
 
+    def _get_explain_prefix(self, query: str, analyze: bool) -> str:
+        assert self._connection is not None, "Connection is not acquired"
+        if not analyze:
+            return "EXPLAIN "
+        # ANALYZE runs the query, so it's only used for reads.
+        if not READ_QUERY_RE.match(query):
+            logger.warning("Only reads can be analyzed, so the query is not run")
+            return "EXPLAIN "
+        server_version = self._connection.get_server_info()
+        if "MariaDB" in server_version:
+            return "ANALYZE "
+        match = VERSION_RE.search(server_version)
+        version = tuple(int(part) for part in match.groups()) if match else ()
+        if version >= EXPLAIN_ANALYZE_VERSION:
+            return "EXPLAIN ANALYZE "
+        logger.warning(
+            "EXPLAIN ANALYZE requires MySQL 8.0.18 or later, so the query is not run"
+        )
+        return "EXPLAIN "
+
+    async def _execute_batch(
+        self,
+        cursor: aiomysql.Cursor,
+        compiled: typing.Optional[CompiledQuery],
+        batch: typing.List[dict],
+    ) -> None:
+        assert compiled is not None
+        logger.debug("Query: %s\nArgs: %d sets", compiled.query, len(batch))
+        await cursor.executemany(compiled.query, batch)
+
+    async def _get_max_stmt_length(self, cursor: aiomysql.Cursor) -> int:
+        # Multi-row statements must fit within the server's
+        # `max_allowed_packet`, less some headroom for the packet header.
+        if self._database._max_allowed_packet is None:
+            await cursor.execute("SELECT @@max_allowed_packet")
+            (max_allowed_packet,) = await cursor.fetchone()
+            self._database._max_allowed_packet = int(max_allowed_packet)
+        return self._database._max_allowed_packet - 1024
+
     def _compile(
-        self, query: ClauseElement
-    ) -> typing.Tuple[str, dict, CompilationContext]:
-        compiled = query.compile(dialect=self._dialect)
-        args = compiled.construct_params()
-        for key, val in args.items():
-            if key in compiled._bind_processors:
-                args[key] = compiled._bind_processors[key](val)
-
-        execution_context = self._dialect.execution_ctx_cls()
-        execution_context.dialect = self._dialect
-        execution_context.result_column_struct = (
-            compiled._result_columns,
-            compiled._ordered_columns,
-            compiled._textual_ordered_columns,
+        self, query: typing.Union[ClauseElement, str], values: typing.Optional[dict]
+    ) -> typing.Tuple[str, dict, CompiledQuery]:
+        compiled = self._get_compiled(query, values)
+        args = compiled.get_args(values)
+
+        logger.debug("Query: %s\nArgs: %s", compiled.query, args)
+        return compiled.query, args, compiled
+
+    def _get_compiled(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: typing.Optional[dict],
+        reused: bool = False,
+    ) -> CompiledQuery:
+        if isinstance(query, str):
+            return self._database.compiled_cache.parse(query, self._parse)
+        elif isinstance(query, CompiledQuery):
+            return query
+        return self._database.compiled_cache.compile(
+            query, values, self._compile_clause, reused
         )
 
-        logger.debug("Query: %s\nArgs: %s", compiled.string, args)
-        return compiled.string, args, CompilationContext(execution_context)
+    def _parse(self, sql: str) -> CompiledQuery:
+        return RawQuery(sql, self._dialect)
+
+    def _compile_clause(
+        self, clause: ClauseElement, column_keys: typing.Optional[list]
+    ) -> CompiledQuery:
+        compiled = compile_clause(clause, self._dialect, column_keys)
+        return CompiledQuery(compiled, self._dialect)
 
     @property
     def raw_connection(self) -> aiomysql.connection.Connection:
@@ -1,28 +1,45 @@
 import logging
 import typing
-from collections.abc import Mapping
+from collections.abc import ItemsView, Mapping, ValuesView
 
 import asyncpg
 from sqlalchemy.dialects.postgresql import pypostgresql
-from sqlalchemy.engine.interfaces import Dialect
+from sqlalchemy.engine.interfaces import Compiled, Dialect
 from sqlalchemy.sql import ClauseElement
-from sqlalchemy.sql.schema import Column
+from sqlalchemy.sql.schema import Column, Table
 from sqlalchemy.types import TypeEngine
 
+from databases.cache import CompiledCache, compile_clause
+from databases.columns import transpose
 from databases.core import DatabaseURL
 from databases.interfaces import ConnectionBackend, DatabaseBackend, TransactionBackend
+from databases.raw_sql import ParsedSQL, check_values, get_value, process_value
+from databases.rows import RowType, make_rows
+from databases.stats import AcquireStats
 
 logger = logging.getLogger("databases")
 
 
 _result_processors = {}  # type: dict
 
+# The index and result processor of a column.
+ColumnInfo = typing.Tuple[int, typing.Optional[typing.Callable]]
+
+# The maximum number of argument sets sent in a single `executemany` call.
+EXECUTE_MANY_CHUNK_SIZE = 10000
+
+# The number of rows fetched at a time by `iterate()`, matching asyncpg's
+# default cursor prefetch.
+ITERATE_BATCH_SIZE = 50
+
 
 class PostgresBackend(DatabaseBackend):
     def __init__(
         self, database_url: typing.Union[DatabaseURL, str], **options: typing.Any
     ) -> None:
         self._database_url = DatabaseURL(database_url)
+        self.compiled_cache = CompiledCache(options.pop("compiled_cache_size", 500))
+        self.acquire_stats = AcquireStats()
         self._options = options
         self._dialect = self._get_dialect()
         self._pool = None
@@ -72,44 +89,94 @@ class PostgresBackend(DatabaseBackend):
     def connection(self) -> "PostgresConnection":
         return PostgresConnection(self, self._dialect)
 
+    def pool_stats(self) -> typing.Dict[str, typing.Any]:
+        pool = self._pool
+        if pool is None:
+            size = idle = min_size = max_size = 0
+        else:
+            size, idle = pool.get_size(), pool.get_idle_size()
+            min_size, max_size = pool.get_min_size(), pool.get_max_size()
+        return {
+            "size": size,
+            "min_size": min_size,
+            "max_size": max_size,
+            "idle": idle,
+            "in_use": size - idle,
+            **self.acquire_stats.get_stats(),
+        }
+
+    def get_compiled(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> "CompiledQuery":
+        return self.connection()._get_compiled(query, values)
+
+    def prepare(
+        self, query: typing.Union[ClauseElement, str], column_keys: list = None
+    ) -> "CompiledQuery":
+        # asyncpg prepares each query server-side once per connection, in
+        # its own statement cache, so there's nothing more to do here.
+        if isinstance(query, str):
+            return RawQuery(query, self._dialect)
+        compiled = compile_clause(query, self._dialect, column_keys)
+        return CompiledQuery(compiled, self._dialect)
+
+
+class RecordMetadata:
+    """
+    Column lookups and result processors for the rows of a compiled statement,
+    built once and shared by every `Record` that the statement returns.
+    """
+
+    def __init__(self, result_columns: tuple, dialect: Dialect) -> None:
+        self.column_map = {}  # type: typing.Dict[str, ColumnInfo]
+        self.column_map_int = {}  # type: typing.Dict[int, ColumnInfo]
+        self.column_map_full = {}  # type: typing.Dict[str, ColumnInfo]
+        self.names = []  # type: typing.List[str]
+        self.processors = []  # type: typing.List[typing.Optional[typing.Callable]]
+        for idx, (column_name, _, column, datatype) in enumerate(result_columns):
+            processor = self._get_processor(datatype, dialect)
+            self.names.append(column_name)
+            self.processors.append(processor)
+            self.column_map[column_name] = (idx, processor)
+            self.column_map_int[idx] = (idx, processor)
+            self.column_map_full[str(column[0])] = (idx, processor)
+
+    def get_names(self, rows: typing.Sequence[asyncpg.Record]) -> typing.List[str]:
+        if self.names or not rows:
+            return self.names
+        # Raw queries have no result columns, so take the names from the rows.
+        return list(rows[0].keys())
+
+    @staticmethod
+    def _get_processor(
+        datatype: TypeEngine, dialect: Dialect
+    ) -> typing.Optional[typing.Callable]:
+        try:
+            return _result_processors[datatype]
+        except KeyError:
+            processor = datatype.result_processor(dialect, None)
+            _result_processors[datatype] = processor
+            return processor
+
 
 class Record(Mapping):
-    def __init__(
-        self, row: asyncpg.Record, result_columns: tuple, dialect: Dialect
-    ) -> None:
+    __slots__ = ("_row", "_metadata")
+
+    def __init__(self, row: asyncpg.Record, metadata: RecordMetadata) -> None:
         self._row = row
-        self._result_columns = result_columns
-        self._dialect = dialect
-        self._column_map = (
-            {}
-        )  # type: typing.Mapping[str, typing.Tuple[int, TypeEngine]]
-        self._column_map_int = (
-            {}
-        )  # type: typing.Mapping[int, typing.Tuple[int, TypeEngine]]
-        self._column_map_full = (
-            {}
-        )  # type: typing.Mapping[str, typing.Tuple[int, TypeEngine]]
-        for idx, (column_name, _, column, datatype) in enumerate(self._result_columns):
-            self._column_map[column_name] = (idx, datatype)
-            self._column_map_int[idx] = (idx, datatype)
-            self._column_map_full[str(column[0])] = (idx, datatype)
+        self._metadata = metadata
 
     def __getitem__(self, key: typing.Any) -> typing.Any:
-        if len(self._column_map) == 0:  # raw query
-            return self._row[tuple(self._row.keys()).index(key)]
+        metadata = self._metadata
+        if len(metadata.column_map) == 0:  # raw query
+            return self._row[key]
         elif type(key) is Column:
-            idx, datatype = self._column_map_full[str(key)]
+            idx, processor = metadata.column_map_full[str(key)]
         elif type(key) is int:
-            idx, datatype = self._column_map_int[key]
+            idx, processor = metadata.column_map_int[key]
         else:
-            idx, datatype = self._column_map[key]
+            idx, processor = metadata.column_map[key]
         raw = self._row[idx]
-        try:
-            processor = _result_processors[datatype]
-        except KeyError:
-            processor = datatype.result_processor(self._dialect, None)
-            _result_processors[datatype] = processor
-
         if processor is not None:
             return processor(raw)
         return raw
@@ -120,6 +187,74 @@ class Record(Mapping):
     def __len__(self) -> int:
         return len(self._row)
 
+    def values(self) -> typing.ValuesView:
+        return RecordValuesView(self)
+
+    def items(self) -> typing.ItemsView:
+        return RecordItemsView(self)
+
+    def _iter_values(self) -> typing.Iterator:
+        processors = self._metadata.processors
+        if not processors:  # raw query
+            return iter(self._row.values())
+        return (
+            raw if processor is None else processor(raw)
+            for processor, raw in zip(processors, self._row.values())
+        )
+
+
+class RecordValuesView(ValuesView):
+    # Iterate the underlying row directly, rather than looking up each key.
+    def __iter__(self) -> typing.Iterator:
+        return self._mapping._iter_values()  # type: ignore
+
+
+class RecordItemsView(ItemsView):
+    def __iter__(self) -> typing.Iterator:
+        record = self._mapping  # type: ignore
+        return zip(record._row.keys(), record._iter_values())
+
+
+class CompiledQuery:
+    def __init__(self, compiled: Compiled, dialect: Dialect) -> None:
+        self.compiled = compiled
+        param_keys = sorted(set(compiled.bind_names.values()))
+        mapping = {key: "$" + str(i) for i, key in enumerate(param_keys, start=1)}
+        self.query = compiled.string % mapping
+        processors = compiled._bind_processors
+        self.params = [(key, processors.get(key)) for key in param_keys]
+        self.metadata = RecordMetadata(compiled._result_columns, dialect)
+
+    def get_args(self, values: typing.Optional[dict]) -> list:
+        params = self.compiled.construct_params(values)
+        return [
+            params[key] if processor is None else processor(params[key])
+            for key, processor in self.params
+        ]
+
+
+class RawQuery(CompiledQuery):
+    """
+    A raw SQL query, with its `:name` placeholders rewritten as `$n`
+    directly rather than by compiling a `text()` construct.
+    """
+
+    def __init__(self, sql: str, dialect: Dialect) -> None:
+        parsed = ParsedSQL(sql)
+        positions = {}  # type: typing.Dict[str, str]
+        for name in parsed.names:
+            positions.setdefault(name, "$" + str(len(positions) + 1))
+        self.query = parsed.render(lambda idx, name: positions[name])
+        self.names = list(positions)
+        self.name_set = parsed.name_set
+        self.dialect = dialect
+        self.metadata = RecordMetadata((), dialect)
+
+    def get_args(self, values: typing.Optional[dict]) -> list:
+        check_values(values, self.name_set)
+        dialect = self.dialect
+        return [process_value(dialect, get_value(values, name)) for name in self.names]
+
 
 class PostgresConnection(ConnectionBackend):
     def __init__(self, database: PostgresBackend, dialect: Dialect):
@@ -130,7 +265,8 @@ class PostgresConnection(ConnectionBackend):
     async def acquire(self) -> None:
         assert self._connection is None, "Connection is already acquired"
         assert self._database._pool is not None, "DatabaseBackend is not running"
-        self._connection = await self._database._pool.acquire()
+        with self._database.acquire_stats.timer():
+            self._connection = await self._database._pool.acquire()
 
     async def release(self) -> None:
         assert self._connection is not None, "Connection is not acquired"
@@ -138,62 +274,226 @@ class PostgresConnection(ConnectionBackend):
         self._connection = await self._database._pool.release(self._connection)
         self._connection = None
 
-    async def fetch_all(self, query: ClauseElement) -> typing.List[typing.Mapping]:
+    async def fetch_all(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        row_type: RowType = "record",
+    ) -> typing.List[typing.Any]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, result_columns = self._compile(query)
-        rows = await self._connection.fetch(query, *args)
-        return [Record(row, result_columns, self._dialect) for row in rows]
-
-    async def fetch_one(self, query: ClauseElement) -> typing.Optional[typing.Mapping]:
+        compiled, args = self._compile(query, values)
+        rows = await self._connection.fetch(compiled.query, *args)
+        metadata = compiled.metadata
+        if row_type != "record":
+            return make_rows(
+                rows, metadata.processors, row_type, metadata.get_names(rows)
+            )
+        return [Record(row, metadata) for row in rows]
+
+    async def fetch_one(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        row_type: RowType = "record",
+    ) -> typing.Optional[typing.Any]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, result_columns = self._compile(query)
-        row = await self._connection.fetchrow(query, *args)
+        compiled, args = self._compile(query, values)
+        row = await self._connection.fetchrow(compiled.query, *args)
         if row is None:
             return None
-        return Record(row, result_columns, self._dialect)
-
-    async def execute(self, query: ClauseElement) -> typing.Any:
+        metadata = compiled.metadata
+        if row_type != "record":
+            return make_rows(
+                [row], metadata.processors, row_type, metadata.get_names([row])
+            )[0]
+        return Record(row, metadata)
+
+    async def fetch_columns(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Dict[str, list]:
+        assert self._connection is not None, "Connection is not acquired"
+        compiled, args = self._compile(query, values)
+        rows = await self._connection.fetch(compiled.query, *args)
+
+        metadata = compiled.metadata
+        if metadata.names:
+            names, processors = metadata.names, metadata.processors
+        else:  # raw query
+            if rows:
+                names = list(rows[0].keys())
+            else:
+                statement = await self._connection.prepare(compiled.query)
+                names = [attribute.name for attribute in statement.get_attributes()]
+            processors = [None] * len(names)
+        return dict(zip(names, transpose(rows, processors)))
+
+    async def execute(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Any:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, result_columns = self._compile(query)
-        return await self._connection.fetchval(query, *args)
+        compiled, args = self._compile(query, values)
+        return await self._connection.fetchval(compiled.query, *args)
 
-    async def execute_many(self, queries: typing.List[ClauseElement]) -> None:
+    async def execute_many(
+        self, query: typing.Union[ClauseElement, str], values: list
+    ) -> None:
         assert self._connection is not None, "Connection is not acquired"
-        # asyncpg uses prepared statements under the hood, so we just
-        # loop through multiple executes here, which should all end up
-        # using the same prepared statement.
-        for single_query in queries:
-            single_query, args, result_columns = self._compile(single_query)
-            await self._connection.execute(single_query, *args)
-
-    async def iterate(
-        self, query: ClauseElement
-    ) -> typing.AsyncGenerator[typing.Any, None]:
+        # Consecutive values that share a compiled statement are sent
+        # through asyncpg's `executemany`, which pipelines the whole batch
+        # in a single round trip. Very large inputs are split into chunks
+        # so that the converted arguments don't all need to be held at once.
+        batch_query = None  # type: typing.Optional[CompiledQuery]
+        batch = []  # type: typing.List[list]
+        for values_set in values:
+            compiled = self._get_compiled(query, values_set, reused=True)
+            if batch and (
+                compiled is not batch_query or len(batch) >= EXECUTE_MANY_CHUNK_SIZE
+            ):
+                await self._execute_batch(batch_query, batch)
+                batch = []
+            batch_query = compiled
+            batch.append(compiled.get_args(values_set))
+        if batch:
+            await self._execute_batch(batch_query, batch)
+
+    async def iterate_batches(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        size: int = None,
+        row_type: RowType = "record",
+    ) -> typing.AsyncGenerator[typing.List[typing.Any], None]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, result_columns = self._compile(query)
-        async for row in self._connection.cursor(query, *args):
-            yield Record(row, result_columns, self._dialect)
+        compiled, args = self._compile(query, values)
+        if size is None:
+            size = ITERATE_BATCH_SIZE
+        cursor = await self._connection.cursor(compiled.query, *args)
+        metadata = compiled.metadata
+        while True:
+            rows = await cursor.fetch(size)
+            if not rows:
+                break
+            if row_type != "record":
+                yield make_rows(
+                    rows, metadata.processors, row_type, metadata.get_names(rows)
+                )
+            else:
+                yield [Record(row, metadata) for row in rows]
+
+    async def copy_records(
+        self,
+        table: typing.Union[Table, str],
+        records: typing.Union[typing.Iterable, typing.AsyncIterable],
+        columns: typing.Sequence[str] = None,
+    ) -> None:
+        assert self._connection is not None, "Connection is not acquired"
+        if isinstance(table, str):
+            table_name, schema_name = table, None
+        else:
+            table_name, schema_name = table.name, table.schema
+            if columns is None:
+                columns = [column.name for column in table.columns]
+            # Apply any bind processors for the column types, since COPY
+            # bypasses SQLAlchemy's usual parameter handling.
+            processors = [
+                table.columns[name].type._cached_bind_processor(self._dialect)
+                for name in columns
+            ]
+            if any(processor is not None for processor in processors):
+                records = self._process_records(records, processors)
+
+        # asyncpg streams records to the server as it consumes them, so
+        # (async) iterables are loaded without being held in memory at once.
+        await self._connection.copy_records_to_table(
+            table_name, records=records, columns=columns, schema_name=schema_name
+        )
+
+    @staticmethod
+    def _process_records(
+        records: typing.Union[typing.Iterable, typing.AsyncIterable],
+        processors: typing.List[typing.Optional[typing.Callable]],
+    ) -> typing.Union[typing.Iterable, typing.AsyncIterable]:
+        def process(record: typing.Sequence) -> tuple:
+            return tuple(
+                value if processor is None else processor(value)
+                for processor, value in zip(processors, record)
+            )
+
+        if isinstance(records, typing.AsyncIterable):
+
+            async def process_async() -> typing.AsyncIterator[tuple]:
+                async for record in records:  # type: ignore
+                    yield process(record)
+
+            return process_async()
+        return (process(record) for record in records)
+
+    async def explain(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        analyze: bool = False,
+    ) -> typing.List[str]:
+        assert self._connection is not None, "Connection is not acquired"
+        compiled, args = self._compile(query, values)
+        if not analyze:
+            rows = await self._connection.fetch("EXPLAIN " + compiled.query, *args)
+        else:
+            # ANALYZE runs the query, so only allow it to read.
+            async with self._connection.transaction(readonly=True):
+                rows = await self._connection.fetch(
+                    "EXPLAIN (ANALYZE, BUFFERS) " + compiled.query, *args
+                )
+        return [row[0] for row in rows]
+
+    def compile(
+        self, query: typing.Union[ClauseElement, str], values: typing.Any = None
+    ) -> typing.Tuple[str, typing.Any]:
+        compiled, args = self._compile(query, values)
+        return compiled.query, args
 
     def transaction(self) -> TransactionBackend:
         return PostgresTransaction(connection=self)
 
-    def _compile(self, query: ClauseElement) -> typing.Tuple[str, list, tuple]:
-        compiled = query.compile(dialect=self._dialect)
-        compiled_params = sorted(compiled.params.items())
-
-        mapping = {
-            key: "$" + str(i) for i, (key, _) in enumerate(compiled_params, start=1)
-        }
-        compiled_query = compiled.string % mapping
-
-        processors = compiled._bind_processors
-        args = [
-            processors[key](val) if key in processors else val
-            for key, val in compiled_params
-        ]
-
-        logger.debug("Query: %s\nArgs: %s", compiled_query, args)
-        return compiled_query, args, compiled._result_columns
+    async def _execute_batch(
+        self, compiled: typing.Optional[CompiledQuery], batch: typing.List[list]
+    ) -> None:
+        assert self._connection is not None, "Connection is not acquired"
+        assert compiled is not None
+        logger.debug("Query: %s\nArgs: %d sets", compiled.query, len(batch))
+        await self._connection.executemany(compiled.query, batch)
+
+    def _compile(
+        self, query: typing.Union[ClauseElement, str], values: typing.Optional[dict]
+    ) -> typing.Tuple[CompiledQuery, list]:
+        compiled = self._get_compiled(query, values)
+        args = compiled.get_args(values)
+
+        logger.debug("Query: %s\nArgs: %s", compiled.query, args)
+        return compiled, args
+
+    def _get_compiled(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: typing.Optional[dict],
+        reused: bool = False,
+    ) -> CompiledQuery:
+        if isinstance(query, str):
+            return self._database.compiled_cache.parse(query, self._parse)
+        elif isinstance(query, CompiledQuery):
+            return query
+        return self._database.compiled_cache.compile(
+            query, values, self._compile_clause, reused
+        )
+
+    def _parse(self, sql: str) -> CompiledQuery:
+        return RawQuery(sql, self._dialect)
+
+    def _compile_clause(
+        self, clause: ClauseElement, column_keys: typing.Optional[list]
+    ) -> CompiledQuery:
+        compiled = compile_clause(clause, self._dialect, column_keys)
+        return CompiledQuery(compiled, self._dialect)
 
     @property
     def raw_connection(self) -> asyncpg.connection.Connection:
@@ -1,67 +1,240 @@
+import asyncio
+import contextlib
 import logging
+import time
 import typing
 import uuid
 
 import aiosqlite
 from sqlalchemy.dialects.sqlite import pysqlite
-from sqlalchemy.engine.interfaces import Dialect, ExecutionContext
+from sqlalchemy.engine.interfaces import Compiled, Dialect, ExecutionContext
 from sqlalchemy.engine.result import ResultMetaData, RowProxy
 from sqlalchemy.sql import ClauseElement
 from sqlalchemy.types import TypeEngine
 
+from databases.cache import CompiledCache, compile_clause
+from databases.columns import transpose
 from databases.core import DatabaseURL
 from databases.interfaces import ConnectionBackend, DatabaseBackend, TransactionBackend
+from databases.raw_sql import ParsedSQL, check_values, get_value, process_value
+from databases.rows import RowType, make_rows
+from databases.stats import AcquireStats
 
 logger = logging.getLogger("databases")
 
+# The number of rows fetched at a time by `iterate()`, matching aiosqlite's
+# default `iter_chunk_size`.
+ITERATE_BATCH_SIZE = 64
+
 
 class SQLiteBackend(DatabaseBackend):
     def __init__(
         self, database_url: typing.Union[DatabaseURL, str], **options: typing.Any
     ) -> None:
         self._database_url = DatabaseURL(database_url)
+        self.compiled_cache = CompiledCache(options.pop("compiled_cache_size", 500))
+        self.acquire_stats = AcquireStats()
         self._options = options
         self._dialect = pysqlite.dialect(paramstyle="qmark")
         # aiosqlite does not support decimals
         self._dialect.supports_native_decimal = False
-        self._pool = SQLitePool(self._database_url, **self._options)
+        self._pool = None  # type: typing.Optional[SQLitePool]
+
+    def _get_connection_kwargs(self) -> dict:
+        url_options = self._database_url.options
+
+        kwargs = {}
+        min_size = url_options.get("min_size")
+        max_size = url_options.get("max_size")
+
+        if min_size is not None:
+            kwargs["min_size"] = int(min_size)
+        if max_size is not None:
+            kwargs["max_size"] = int(max_size)
+
+        kwargs.update(self._options)
+
+        return kwargs
 
     async def connect(self) -> None:
-        pass
-        # assert self._pool is None, "DatabaseBackend is already running"
-        # self._pool = await aiomysql.create_pool(
-        #     host=self._database_url.hostname,
-        #     port=self._database_url.port or 3306,
-        #     user=self._database_url.username or getpass.getuser(),
-        #     password=self._database_url.password,
-        #     db=self._database_url.database,
-        #     autocommit=True,
-        # )
+        assert self._pool is None, "DatabaseBackend is already running"
+        kwargs = self._get_connection_kwargs()
+        pool = SQLitePool(self._database_url, **kwargs)
+        await pool.connect()
+        self._pool = pool
 
     async def disconnect(self) -> None:
-        pass
-        # assert self._pool is not None, "DatabaseBackend is not running"
-        # self._pool.close()
-        # await self._pool.wait_closed()
-        # self._pool = None
+        assert self._pool is not None, "DatabaseBackend is not running"
+        await self._pool.close()
+        self._pool = None
 
     def connection(self) -> "SQLiteConnection":
-        return SQLiteConnection(self._pool, self._dialect)
+        return SQLiteConnection(self, self._dialect)
+
+    def pool_stats(self) -> typing.Dict[str, typing.Any]:
+        pool = self._pool
+        if pool is None:
+            size = idle = min_size = max_size = 0
+        else:
+            size, idle = pool.get_size(), pool.get_idle_size()
+            min_size, max_size = pool.get_min_size(), pool.get_max_size()
+        return {
+            "size": size,
+            "min_size": min_size,
+            "max_size": max_size,
+            "idle": idle,
+            "in_use": size - idle,
+            **self.acquire_stats.get_stats(),
+        }
+
+    def get_compiled(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> "CompiledQuery":
+        return self.connection()._get_compiled(query, values)
+
+    def prepare(
+        self, query: typing.Union[ClauseElement, str], column_keys: list = None
+    ) -> "CompiledQuery":
+        if isinstance(query, str):
+            return RawQuery(query, self._dialect)
+        compiled = compile_clause(query, self._dialect, column_keys)
+        return CompiledQuery(compiled, self._dialect)
 
 
 class SQLitePool:
-    def __init__(self, url: DatabaseURL, **options: typing.Any) -> None:
+    """
+    A bounded pool of aiosqlite connections.
+
+    Idle connections are reused most-recently-released first, so that a
+    small working set of connections keeps its page cache warm, and
+    connections above `min_size` are closed once they have been idle for
+    longer than `max_inactive_connection_lifetime` seconds. As with asyncpg,
+    a lifetime of zero disables this. Closing the pool also closes the
+    connections that are still in use.
+    """
+
+    def __init__(
+        self,
+        url: DatabaseURL,
+        *,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_inactive_connection_lifetime: float = 300.0,
+        **options: typing.Any,
+    ) -> None:
+        assert 0 <= min_size <= max_size, "min_size must be between 0 and max_size"
         self._url = url
+        self._min_size = min_size
+        self._max_size = max_size
+        self._max_inactive_connection_lifetime = max_inactive_connection_lifetime
         self._options = options
+        self._idle = []  # type: typing.List[typing.Tuple[aiosqlite.Connection, float]]
+        self._in_use = set()  # type: typing.Set[aiosqlite.Connection]
+        self._size = 0
+        self._semaphore = None  # type: typing.Optional[asyncio.Semaphore]
+
+    async def connect(self) -> None:
+        assert self._semaphore is None, "SQLitePool is already running"
+        self._semaphore = asyncio.Semaphore(self._max_size)
+        for _ in range(self._min_size):
+            connection = await self._connect()
+            self._idle.append((connection, time.monotonic()))
+
+    async def close(self) -> None:
+        assert self._semaphore is not None, "SQLitePool is not running"
+        self._semaphore = None
+        idle, self._idle = self._idle, []
+        in_use, self._in_use = self._in_use, set()
+        for connection, _ in idle:
+            await self._close(connection)
+        for connection in in_use:
+            await self._close(connection)
 
     async def acquire(self) -> aiosqlite.Connection:
+        semaphore = self._semaphore
+        assert semaphore is not None, "SQLitePool is not running"
+        await semaphore.acquire()
+        try:
+            await self._reap_idle(time.monotonic())
+            if self._idle:
+                connection, _ = self._idle.pop()
+            else:
+                connection = await self._connect()
+        except BaseException:
+            semaphore.release()
+            raise
+        self._in_use.add(connection)
+        return connection
+
+    async def release(
+        self, connection: aiosqlite.Connection, discard: bool = False
+    ) -> None:
+        if connection not in self._in_use:
+            # The pool was closed while the connection was in use, which
+            # closed the connection too.
+            return
+        self._in_use.discard(connection)
+        semaphore = self._semaphore
+        assert semaphore is not None
+        if discard:
+            try:
+                await self._close(connection)
+            finally:
+                semaphore.release()
+            return
+        try:
+            # Reset the connection before handing it back to the pool.
+            if connection.in_transaction:
+                await connection.rollback()
+        except Exception:
+            await self._close(connection)
+            semaphore.release()
+            raise
+
+        if semaphore is not self._semaphore:
+            # The pool was closed while the connection was being reset.
+            await self._close(connection)
+            return
+
+        now = time.monotonic()
+        self._idle.append((connection, now))
+        semaphore.release()
+        await self._reap_idle(now)
+
+    def get_size(self) -> int:
+        return self._size
+
+    def get_idle_size(self) -> int:
+        return len(self._idle)
+
+    def get_min_size(self) -> int:
+        return self._min_size
+
+    def get_max_size(self) -> int:
+        return self._max_size
+
+    async def _reap_idle(self, now: float) -> None:
+        # Idle connections are stacked oldest first.
+        lifetime = self._max_inactive_connection_lifetime
+        while (
+            lifetime
+            and self._size > self._min_size
+            and self._idle
+            and now - self._idle[0][1] > lifetime
+        ):
+            connection, _ = self._idle.pop(0)
+            await self._close(connection)
+
+    async def _connect(self) -> aiosqlite.Connection:
         connection = aiosqlite.connect(
             database=self._url.database, isolation_level=None, **self._options
         )
         await connection.__aenter__()
+        self._size += 1
         return connection
 
-    async def release(self, connection: aiosqlite.Connection) -> None:
+    async def _close(self, connection: aiosqlite.Connection) -> None:
+        self._size -= 1
         await connection.__aexit__(None, None, None)
 
 
@@ -70,92 +243,302 @@ class CompilationContext:
         self.context = context
 
 
+def get_compilation_context(
+    dialect: Dialect, result_column_struct: tuple
+) -> CompilationContext:
+    execution_context = dialect.execution_ctx_cls()
+    execution_context.dialect = dialect
+    execution_context.result_column_struct = result_column_struct
+    return CompilationContext(execution_context)
+
+
+class CompiledQuery:
+    def __init__(self, compiled: Compiled, dialect: Dialect) -> None:
+        self.compiled = compiled
+        self.query = compiled.string
+        processors = compiled._bind_processors
+        self.params = [(key, processors.get(key)) for key in compiled.positiontup]
+
+        self.context = get_compilation_context(
+            dialect,
+            (
+                compiled._result_columns,
+                compiled._ordered_columns,
+                compiled._textual_ordered_columns,
+            ),
+        )
+        self._description = None  # type: typing.Optional[tuple]
+        self._metadata = None  # type: typing.Optional[ResultMetaData]
+
+    def get_metadata(self, description: tuple) -> ResultMetaData:
+        # The result metadata is reused for as long as the statement keeps
+        # returning the same columns.
+        if description != self._description:
+            self._metadata = ResultMetaData(self.context, description)
+            self._description = description
+        return self._metadata
+
+    def get_args(self, values: typing.Optional[dict]) -> list:
+        params = self.compiled.construct_params(values)
+        return [
+            params[key] if processor is None else processor(params[key])
+            for key, processor in self.params
+        ]
+
+
+class RawQuery(CompiledQuery):
+    """
+    A raw SQL query, with its `:name` placeholders rewritten as `?`
+    directly rather than by compiling a `text()` construct.
+    """
+
+    def __init__(self, sql: str, dialect: Dialect) -> None:
+        parsed = ParsedSQL(sql)
+        self.query = parsed.render(lambda idx, name: "?")
+        self.names = parsed.names
+        self.name_set = parsed.name_set
+        self.dialect = dialect
+        self.context = get_compilation_context(dialect, ([], False, False))
+        self._description = None
+        self._metadata = None
+
+    def get_args(self, values: typing.Optional[dict]) -> list:
+        check_values(values, self.name_set)
+        dialect = self.dialect
+        return [process_value(dialect, get_value(values, name)) for name in self.names]
+
+
 class SQLiteConnection(ConnectionBackend):
-    def __init__(self, pool: SQLitePool, dialect: Dialect):
-        self._pool = pool
+    def __init__(self, database: SQLiteBackend, dialect: Dialect):
+        self._database = database
         self._dialect = dialect
-        self._connection = None
+        self._connection = None  # type: typing.Optional[aiosqlite.Connection]
+        # The pool that the connection came from, which it goes back to even
+        # if the backend has since disconnected.
+        self._pool = None  # type: typing.Optional[SQLitePool]
+        self._discard = False
 
     async def acquire(self) -> None:
         assert self._connection is None, "Connection is already acquired"
-        self._connection = await self._pool.acquire()
+        assert self._database._pool is not None, "DatabaseBackend is not running"
+        pool = self._database._pool
+        with self._database.acquire_stats.timer():
+            self._connection = await pool.acquire()
+        self._pool = pool
 
     async def release(self) -> None:
         assert self._connection is not None, "Connection is not acquired"
-        await self._pool.release(self._connection)
+        assert self._pool is not None
+        await self._pool.release(self._connection, discard=self._discard)
         self._connection = None
-
-    async def fetch_all(self, query: ClauseElement) -> typing.List[typing.Mapping]:
+        self._pool = None
+        self._discard = False
+
+    async def fetch_all(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        row_type: RowType = "record",
+    ) -> typing.List[typing.Any]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, context = self._compile(query)
-
-        async with self._connection.execute(query, args) as cursor:
-            rows = await cursor.fetchall()
-            metadata = ResultMetaData(context, cursor.description)
-            return [
-                RowProxy(metadata, row, metadata._processors, metadata._keymap)
-                for row in rows
-            ]
-
-    async def fetch_one(self, query: ClauseElement) -> typing.Optional[typing.Mapping]:
+        query, args, compiled = self._compile(query, values)
+
+        with self._discard_on_cancel():
+            async with await self._execute(query, args) as cursor:
+                rows = await cursor.fetchall()
+                description = cursor.description
+        metadata = compiled.get_metadata(description)
+        if row_type != "record":
+            return make_rows(rows, metadata._processors, row_type, metadata.keys)
+        return [
+            RowProxy(metadata, row, metadata._processors, metadata._keymap)
+            for row in rows
+        ]
+
+    async def fetch_one(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        row_type: RowType = "record",
+    ) -> typing.Optional[typing.Any]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, context = self._compile(query)
-
-        async with self._connection.execute(query, args) as cursor:
-            row = await cursor.fetchone()
-            if row is None:
-                return None
-            metadata = ResultMetaData(context, cursor.description)
-            return RowProxy(metadata, row, metadata._processors, metadata._keymap)
-
-    async def execute(self, query: ClauseElement) -> typing.Any:
+        query, args, compiled = self._compile(query, values)
+
+        with self._discard_on_cancel():
+            async with await self._execute(query, args) as cursor:
+                row = await cursor.fetchone()
+                description = cursor.description
+        if row is None:
+            return None
+        metadata = compiled.get_metadata(description)
+        if row_type != "record":
+            return make_rows([row], metadata._processors, row_type, metadata.keys)[0]
+        return RowProxy(metadata, row, metadata._processors, metadata._keymap)
+
+    async def fetch_columns(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Dict[str, list]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, context = self._compile(query)
-        cursor = await self._connection.execute(query, args)
-        await cursor.close()
+        query, args, compiled = self._compile(query, values)
+
+        with self._discard_on_cancel():
+            async with await self._execute(query, args) as cursor:
+                rows = await cursor.fetchall()
+                description = cursor.description
+        if description is None:
+            return {}
+        metadata = compiled.get_metadata(description)
+        names = [column[0] for column in description]
+        return dict(zip(names, transpose(rows, metadata._processors)))
+
+    async def execute(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Any:
+        assert self._connection is not None, "Connection is not acquired"
+        query, args, compiled = self._compile(query, values)
+        with self._discard_on_cancel():
+            cursor = await self._execute(query, args)
+            await cursor.close()
         return cursor.lastrowid
 
-    async def execute_many(self, queries: typing.List[ClauseElement]) -> None:
+    async def execute_many(
+        self, query: typing.Union[ClauseElement, str], values: list
+    ) -> None:
         assert self._connection is not None, "Connection is not acquired"
-        for single_query in queries:
-            await self.execute(single_query)
-
-    async def iterate(
-        self, query: ClauseElement
-    ) -> typing.AsyncGenerator[typing.Any, None]:
+        # Consecutive values that share a compiled statement are handed to
+        # sqlite3's `executemany` in a single hop to the aiosqlite thread.
+        batches = []  # type: typing.List[typing.Tuple[str, typing.List[list]]]
+        batch_query = None  # type: typing.Optional[CompiledQuery]
+        for values_set in values:
+            compiled = self._get_compiled(query, values_set, reused=True)
+            if compiled is not batch_query:
+                batches.append((compiled.query, []))
+                batch_query = compiled
+            batches[-1][1].append(compiled.get_args(values_set))
+
+        # Without an explicit transaction every row would be committed
+        # individually, so wrap the whole batch in one.
+        is_root = not self._connection.in_transaction
+        with self._discard_on_cancel():
+            if is_root:
+                cursor = await self._connection.execute("BEGIN")
+                await cursor.close()
+            try:
+                for single_query, args in batches:
+                    logger.debug("Query: %s\nArgs: %d sets", single_query, len(args))
+                    cursor = await self._connection.executemany(single_query, args)
+                    await cursor.close()
+            except BaseException:
+                if is_root:
+                    cursor = await self._connection.execute("ROLLBACK")
+                    await cursor.close()
+                raise
+            if is_root:
+                cursor = await self._connection.execute("COMMIT")
+                await cursor.close()
+
+    async def iterate_batches(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        size: int = None,
+        row_type: RowType = "record",
+    ) -> typing.AsyncGenerator[typing.List[typing.Any], None]:
+        assert self._connection is not None, "Connection is not acquired"
+        query, args, compiled = self._compile(query, values)
+        if size is None:
+            size = ITERATE_BATCH_SIZE
+        with self._discard_on_cancel():
+            async with await self._execute(query, args) as cursor:
+                metadata = compiled.get_metadata(cursor.description)
+                while True:
+                    rows = await cursor.fetchmany(size)
+                    if not rows:
+                        break
+                    if row_type != "record":
+                        yield make_rows(
+                            rows, metadata._processors, row_type, metadata.keys
+                        )
+                    else:
+                        yield [
+                            RowProxy(
+                                metadata, row, metadata._processors, metadata._keymap
+                            )
+                            for row in rows
+                        ]
+
+    async def explain(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        analyze: bool = False,
+    ) -> typing.List[str]:
         assert self._connection is not None, "Connection is not acquired"
-        query, args, context = self._compile(query)
-        cursor = await self._connection.cursor()
-        async with self._connection.execute(query, args) as cursor:
-            metadata = ResultMetaData(context, cursor.description)
-            async for row in cursor:
-                yield RowProxy(metadata, row, metadata._processors, metadata._keymap)
+        if analyze:
+            logger.warning("SQLite can't analyze queries, so the query is not run")
+        query, args, compiled = self._compile(query, values)
+        query = "EXPLAIN QUERY PLAN " + query
+        with self._discard_on_cancel():
+            async with await self._execute(query, args) as cursor:
+                rows = await cursor.fetchall()
+        return [row[-1] for row in rows]
+
+    def compile(
+        self, query: typing.Union[ClauseElement, str], values: typing.Any = None
+    ) -> typing.Tuple[str, typing.Any]:
+        query, args, compiled = self._compile(query, values)
+        return query, args
 
     def transaction(self) -> TransactionBackend:
         return SQLiteTransaction(self)
 
+    async def _execute(self, query: str, args: list) -> aiosqlite.Cursor:
+        assert self._connection is not None, "Connection is not acquired"
+        return await self._connection.execute(query, args)
+
+    @contextlib.contextmanager
+    def _discard_on_cancel(self) -> typing.Iterator[None]:
+        # Cancelling a call to aiosqlite doesn't stop it running on
+        # aiosqlite's thread, and a statement or cursor left behind would
+        # keep the database locked, so the connection can't go back into
+        # the pool. It's closed instead, which waits for the call to finish.
+        try:
+            yield
+        except asyncio.CancelledError:
+            self._discard = True
+            raise
+
     def _compile(
-        self, query: ClauseElement
-    ) -> typing.Tuple[str, list, CompilationContext]:
-        compiled = query.compile(dialect=self._dialect)
-        args = []
-        for key, raw_val in compiled.construct_params().items():
-            if key in compiled._bind_processors:
-                val = compiled._bind_processors[key](raw_val)
-            else:
-                val = raw_val
-            args.append(val)
-
-        execution_context = self._dialect.execution_ctx_cls()
-        execution_context.dialect = self._dialect
-        execution_context.result_column_struct = (
-            compiled._result_columns,
-            compiled._ordered_columns,
-            compiled._textual_ordered_columns,
+        self, query: typing.Union[ClauseElement, str], values: typing.Optional[dict]
+    ) -> typing.Tuple[str, list, CompiledQuery]:
+        compiled = self._get_compiled(query, values)
+        args = compiled.get_args(values)
+
+        logger.debug("Query: %s\nArgs: %s", compiled.query, args)
+        return compiled.query, args, compiled
+
+    def _get_compiled(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: typing.Optional[dict],
+        reused: bool = False,
+    ) -> CompiledQuery:
+        if isinstance(query, str):
+            return self._database.compiled_cache.parse(query, self._parse)
+        elif isinstance(query, CompiledQuery):
+            return query
+        return self._database.compiled_cache.compile(
+            query, values, self._compile_clause, reused
         )
 
-        logger.debug("Query: %s\nArgs: %s", compiled.string, args)
-        return compiled.string, args, CompilationContext(execution_context)
+    def _parse(self, sql: str) -> CompiledQuery:
+        return RawQuery(sql, self._dialect)
+
+    def _compile_clause(
+        self, clause: ClauseElement, column_keys: typing.Optional[list]
+    ) -> CompiledQuery:
+        compiled = compile_clause(clause, self._dialect, column_keys)
+        return CompiledQuery(compiled, self._dialect)
 
     @property
     def raw_connection(self) -> aiosqlite.core.Connection:
@@ -0,0 +1,368 @@
+import sys
+import time
+import typing
+import weakref
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from sqlalchemy.engine.interfaces import Compiled, Dialect
+from sqlalchemy.exc import CompileError
+from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.elements import TextClause
+from sqlalchemy.sql.expression import TableClause
+from sqlalchemy.sql.util import find_tables
+
+T = typing.TypeVar("T")
+
+
+def compile_clause(
+    clause: ClauseElement, dialect: Dialect, column_keys: typing.Optional[list]
+) -> Compiled:
+    """
+    Compile `clause` for the values named by `column_keys`, raising
+    `CompileError` if any of them aren't used by the statement, as
+    `query.values(**values)` would.
+    """
+    compiled = clause.compile(dialect=dialect, column_keys=column_keys)
+    if column_keys:
+        unused = set(column_keys).difference(compiled.bind_names.values())
+        if unused:
+            raise CompileError(
+                "Unconsumed column names: %s" % ", ".join(sorted(unused))
+            )
+    return compiled
+
+
+class CompiledCache:
+    """
+    A bounded LRU cache of compiled statements.
+
+    Statements are keyed by their structure rather than their bound values.
+    Raw SQL strings are parsed rather than compiled, and are keyed by their
+    text alone. SQLAlchemy constructs are keyed by the construct itself
+    together with the names of the values supplied, in the same way as
+    SQLAlchemy's own `compiled_cache`. Only constructs that are reused can
+    benefit, so a construct is only cached once it is compiled a second time.
+    Hot statements should be built once using `bindparam()`, with the values
+    passed in at execution time.
+    """
+
+    def __init__(self, maxsize: int = 500) -> None:
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # type: OrderedDict
+        # The keys of constructs that have been compiled once, held weakly
+        # so that statements built afresh for each call are never stored.
+        self._seen = weakref.WeakKeyDictionary()  # type: weakref.WeakKeyDictionary
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def compile(
+        self,
+        query: ClauseElement,
+        values: typing.Optional[dict],
+        compiler: typing.Callable[[ClauseElement, typing.Optional[list]], T],
+        reused: bool = False,
+    ) -> T:
+        """
+        Return the compiled form of `query`, calling
+        `compiler(clause, column_keys)` if it is not already cached. With
+        `reused`, the caller is about to run it again, so it is cached
+        straight away.
+        """
+        key = self._get_key(query, values)
+        if key is not None:
+            try:
+                compiled = self._entries[key]
+            except KeyError:
+                pass
+            else:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+
+        self.misses += 1
+        clause, column_keys = self._build_clause(query, values)
+        compiled = compiler(clause, column_keys)
+        if key is not None and (reused or self._is_reused(query, key)):
+            self._store(key, compiled)
+        return compiled
+
+    def parse(self, query: str, parser: typing.Callable[[str], T]) -> T:
+        """
+        Return the parsed form of the raw SQL `query`, calling
+        `parser(query)` if it is not already cached.
+        """
+        # Parsed queries are keyed by the bare string, which can't collide
+        # with the tuple keys of compiled statements.
+        try:
+            parsed = self._entries[query]
+        except KeyError:
+            self.misses += 1
+            parsed = parser(query)
+            self._store(query, parsed)
+            return parsed
+        self._entries.move_to_end(query)
+        self.hits += 1
+        return parsed
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _is_reused(self, query: ClauseElement, key: tuple) -> bool:
+        # The query itself is left out of the remembered key, since holding
+        # it would keep the weak reference alive.
+        column_keys = key[1:]
+        seen = self._seen.setdefault(query, set())
+        if column_keys in seen:
+            seen.discard(column_keys)
+            return True
+        seen.add(column_keys)
+        return False
+
+    def _store(self, key: typing.Hashable, value: typing.Any) -> None:
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @staticmethod
+    def _get_key(
+        query: ClauseElement, values: typing.Optional[dict]
+    ) -> typing.Optional[tuple]:
+        if not values:
+            return (query, ())
+        if any(isinstance(value, ClauseElement) for value in values.values()):
+            # SQL expressions are rendered inline, so can't be cached.
+            return None
+        return (query, tuple(sorted(values)))
+
+    @staticmethod
+    def _build_clause(
+        query: ClauseElement, values: typing.Optional[dict]
+    ) -> typing.Tuple[ClauseElement, typing.Optional[list]]:
+        if values:
+            if any(isinstance(value, ClauseElement) for value in values.values()):
+                return query.values(**values), None
+            return query, sorted(values)
+        return query, None
+
+
+class ResultCache:
+    """
+    A bounded LRU cache of query results, with a time-to-live per entry and
+    an approximate bound on the memory that the cached results use.
+
+    Results are keyed by their compiled SQL and bound parameters. Results of
+    SQLAlchemy constructs are tagged with the tables that they read, so that
+    writes to those tables invalidate them. Results of raw SQL queries can't
+    be tagged, so they are only expired by their TTL or by a raw SQL write.
+    """
+
+    def __init__(
+        self, maxsize: int = 1000, ttl: float = 60.0, max_bytes: int = 64 * 1024 * 1024
+    ) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = OrderedDict()  # type: OrderedDict
+        # The keys of the results that read each table. Results that can't
+        # be tagged with tables are held under `None`.
+        self._tables = (
+            {}
+        )  # type: typing.Dict[typing.Optional[str], typing.Set[typing.Hashable]]
+        # Counts of the invalidations of each table, and of the whole cache,
+        # so that a result read while a write invalidated it isn't stored.
+        self._generations = {}  # type: typing.Dict[typing.Optional[str], int]
+        self._clears = 0
+        # The tables read by each SQLAlchemy construct, held weakly.
+        self._query_tables = (
+            weakref.WeakKeyDictionary()
+        )  # type: weakref.WeakKeyDictionary
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_key(
+        self,
+        query: typing.Union[ClauseElement, str],
+        compiled: typing.Any,
+        values: typing.Optional[dict],
+        *extra: typing.Hashable,
+    ) -> typing.Optional[typing.Tuple[typing.Hashable, typing.Optional[frozenset]]]:
+        """
+        Return the key for the results of `query`, from the backend's
+        `compiled` form of it, together with the names of the tables that it
+        reads, or `None` if the results can't be cached.
+        """
+        args = compiled.get_args(values)
+        if isinstance(args, dict):
+            args = sorted(args.items())
+        key = (compiled.query, tuple(args)) + extra
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key, self._get_tables(query)
+
+    def get(self, key: typing.Hashable) -> typing.Any:
+        """
+        Return the cached result for `key`, or raise `KeyError`.
+        """
+        try:
+            expires, size, tables, result = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            raise
+        if expires < time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            raise KeyError(key)
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return result
+
+    def get_generation(self, tables: typing.Optional[frozenset]) -> typing.Hashable:
+        """
+        Return a token that changes whenever results that read `tables` are
+        invalidated, to be taken before the query runs and passed to `set()`.
+        """
+        generations = self._generations
+        return (
+            self._clears,
+            tuple(generations.get(table, 0) for table in self._get_tags(tables)),
+        )
+
+    def set(
+        self,
+        key: typing.Hashable,
+        result: typing.Any,
+        tables: typing.Optional[frozenset],
+        generation: typing.Hashable = None,
+    ) -> None:
+        """
+        Cache `result` for `key`, unless it has been invalidated since
+        `generation` was taken.
+        """
+        if generation is not None and generation != self.get_generation(tables):
+            return
+        size = self._get_size(result)
+        if self.maxsize <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = (time.monotonic() + self.ttl, size, tables, result)
+        self.bytes += size
+        for table in self._get_tags(tables):
+            self._tables.setdefault(table, set()).add(key)
+
+        while len(self._entries) > self.maxsize or self.bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(self, tables: typing.Iterable[str] = None) -> None:
+        """
+        Drop the cached results that read any of `tables`, along with any
+        that can't be tagged with tables. Drops everything if `tables` is
+        `None`.
+        """
+        if tables is None:
+            self.invalidations += len(self._entries)
+            self.clear()
+            return
+
+        keys = set()  # type: typing.Set[typing.Hashable]
+        for table in [*tables, None]:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            keys.update(self._tables.get(table, ()))
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._tables.clear()
+        self._clears += 1
+        self.bytes = 0
+
+    def stats(self) -> typing.Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+    def _remove(self, key: typing.Hashable) -> None:
+        expires, size, tables, result = self._entries.pop(key)
+        self.bytes -= size
+        for table in self._get_tags(tables):
+            keys = self._tables[table]
+            keys.discard(key)
+            if not keys:
+                del self._tables[table]
+
+    @staticmethod
+    def _get_tags(
+        tables: typing.Optional[frozenset],
+    ) -> typing.Iterable[typing.Optional[str]]:
+        return (None,) if tables is None else tables
+
+    def _get_tables(
+        self, query: typing.Union[ClauseElement, str]
+    ) -> typing.Optional[frozenset]:
+        if isinstance(query, (str, TextClause)):
+            return None
+        try:
+            return self._query_tables[query]
+        except KeyError:
+            tables = self._query_tables[query] = get_table_names(query)
+            return tables
+
+    @classmethod
+    def _get_size(cls, value: typing.Any) -> int:
+        # An estimate, which counts the rows and their values but not any
+        # objects shared between rows, such as result metadata.
+        size = sys.getsizeof(value)
+        if isinstance(value, list):
+            size += sum(cls._get_size(item) for item in value)
+        elif isinstance(value, Mapping):
+            size += sum(sys.getsizeof(item) for item in value.values())
+        return size
+
+
+def get_table_names(clause: ClauseElement) -> frozenset:
+    """
+    Return the names of the tables that a SQLAlchemy construct refers to.
+    """
+    # Columns that don't belong to a table, such as `func.count()` or
+    # `literal_column()`, are found as `None`.
+    return frozenset(
+        table.name
+        for table in find_tables(clause, check_columns=True, include_crud=True)
+        if isinstance(table, TableClause)
+    )
@@ -0,0 +1,39 @@
+import typing
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover
+    pyarrow = None  # type: ignore
+
+COLUMN_FORMATS = ("list", "numpy", "arrow")
+
+
+def transpose(
+    rows: typing.Iterable[typing.Iterable],
+    processors: typing.Sequence[typing.Optional[typing.Callable]],
+) -> typing.List[list]:
+    """
+    Turn driver rows into a list of values for each column, applying each
+    column's result processor across the whole column.
+    """
+    columns = list(zip(*rows)) or [() for _ in processors]
+    return [
+        list(column) if processor is None else list(map(processor, column))
+        for processor, column in zip(processors, columns)
+    ]
+
+
+def convert_columns(columns: typing.Dict[str, list], format: str) -> typing.Any:
+    assert format in COLUMN_FORMATS, f"format must be one of {COLUMN_FORMATS}"
+    if format == "numpy":
+        assert numpy is not None, "numpy must be installed to use format='numpy'"
+        return {name: numpy.array(values) for name, values in columns.items()}
+    elif format == "arrow":
+        assert pyarrow is not None, "pyarrow must be installed to use format='arrow'"
+        return pyarrow.table(columns)
+    return columns
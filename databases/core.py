@@ -1,15 +1,23 @@
 import asyncio
+import copy
 import functools
+import random
 import sys
+import time
 import typing
 from types import TracebackType
 from urllib.parse import SplitResult, parse_qsl, urlsplit
 
-from sqlalchemy import text
 from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.schema import Table
 
+from databases.cache import CompiledCache, ResultCache, get_table_names
+from databases.columns import convert_columns
+from databases.hooks import Hooks, QueryEvent
 from databases.importer import import_from_string
 from databases.interfaces import ConnectionBackend, DatabaseBackend, TransactionBackend
+from databases.rows import ROW_TYPES, RowType
+from databases.slow_queries import SlowQueryLog
 
 if sys.version_info >= (3, 7):  # pragma: no cover
     from contextvars import ContextVar
@@ -29,18 +37,36 @@ class Database:
         url: typing.Union[str, "DatabaseURL"],
         *,
         force_rollback: bool = False,
+        replicas: typing.Sequence[typing.Union[str, "DatabaseURL"]] = (),
+        result_cache: ResultCache = None,
+        slow_query_log: SlowQueryLog = None,
+        row_type: RowType = "record",
         **options: typing.Any,
     ):
+        assert row_type in ROW_TYPES, f"row_type must be one of {ROW_TYPES}"
         self.url = DatabaseURL(url)
         self.options = options
+        self.row_type = row_type
         self.is_connected = False
+        self.result_cache = result_cache
+        self.hooks = Hooks()
+        self.slow_query_log = slow_query_log
+        if slow_query_log is not None:
+            self.hooks.add("after_query", slow_query_log)
 
         self._force_rollback = force_rollback
 
-        backend_str = self.SUPPORTED_BACKENDS[self.url.dialect]
-        backend_cls = import_from_string(backend_str)
-        assert issubclass(backend_cls, DatabaseBackend)
-        self._backend = backend_cls(self.url, **self.options)
+        self._backend = self._create_backend(self.url)
+
+        # Reads made outside of a transaction are routed to the replicas,
+        # if there are any.
+        self._replicas = [
+            Replica(self._create_backend(DatabaseURL(replica_url)))
+            for replica_url in replicas
+        ]
+        self._use_primary_context = ContextVar(
+            "use_primary_context", default=False
+        )  # type: ContextVar
 
         # Connections are stored as task-local state.
         self._connection_context = ContextVar("connection_context")  # type: ContextVar
@@ -51,7 +77,7 @@ class Database:
         self._global_transaction = None  # type: typing.Optional[Transaction]
 
         if self._force_rollback:
-            self._global_connection = Connection(self._backend)
+            self._global_connection = Connection(self._backend, self.hooks)
             self._global_transaction = self._global_connection.transaction(
                 force_rollback=True
             )
@@ -63,6 +89,8 @@ class Database:
         assert not self.is_connected, "Already connected."
 
         await self._backend.connect()
+        for replica in self._replicas:
+            await replica.backend.connect()
         self.is_connected = True
 
         if self._force_rollback:
@@ -79,6 +107,8 @@ class Database:
             assert self._global_transaction is not None
             await self._global_transaction.__aexit__()
 
+        for replica in self._replicas:
+            await replica.backend.disconnect()
         await self._backend.disconnect()
         self.is_connected = False
 
@@ -95,44 +125,227 @@ class Database:
         await self.disconnect()
 
     async def fetch_all(
-        self, query: typing.Union[ClauseElement, str], values: dict = None
-    ) -> typing.List[typing.Mapping]:
-        async with self.connection() as connection:
-            return await connection.fetch_all(query, values)
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        cache: bool = False,
+        row_type: str = None,
+        model: typing.Callable = None,
+    ) -> typing.List[typing.Any]:
+        kwargs = {
+            "row_type": row_type or self.row_type,
+            "model": model,
+        }  # type: typing.Dict[str, typing.Any]
+        if cache:
+            return list(await self._fetch_cached("fetch_all", query, values, **kwargs))
+        fast_connection = self._fast_connection(read=True)
+        if fast_connection is not None:
+            return await self._run_fast(
+                fast_connection, "fetch_all", query, values, model or kwargs["row_type"]
+            )
+        async with self._read_connection() as connection:
+            return await connection.fetch_all(query, values, **kwargs)
 
     async def fetch_one(
-        self, query: typing.Union[ClauseElement, str], values: dict = None
-    ) -> typing.Optional[typing.Mapping]:
-        async with self.connection() as connection:
-            return await connection.fetch_one(query, values)
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        cache: bool = False,
+        row_type: str = None,
+        model: typing.Callable = None,
+    ) -> typing.Optional[typing.Any]:
+        kwargs = {
+            "row_type": row_type or self.row_type,
+            "model": model,
+        }  # type: typing.Dict[str, typing.Any]
+        if cache:
+            return await self._fetch_cached("fetch_one", query, values, **kwargs)
+        fast_connection = self._fast_connection(read=True)
+        if fast_connection is not None:
+            return await self._run_fast(
+                fast_connection, "fetch_one", query, values, model or kwargs["row_type"]
+            )
+        async with self._read_connection() as connection:
+            return await connection.fetch_one(query, values, **kwargs)
 
     async def fetch_val(
         self,
         query: typing.Union[ClauseElement, str],
         values: dict = None,
         column: typing.Any = 0,
+        *,
+        cache: bool = False,
     ) -> typing.Any:
-        async with self.connection() as connection:
+        if cache:
+            return await self._fetch_cached("fetch_val", query, values, column=column)
+        fast_connection = self._fast_connection(read=True)
+        if fast_connection is not None:
+            row = await self._run_fast(fast_connection, "fetch_one", query, values)
+            return None if row is None else row[column]
+        async with self._read_connection() as connection:
             return await connection.fetch_val(query, values, column=column)
 
+    async def fetch_columns(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        format: str = "list",
+    ) -> typing.Any:
+        """
+        Return the results as a dict of column name to the list of values in
+        that column, or with `format="numpy"` to a NumPy array. With
+        `format="arrow"`, return a pyarrow `Table`.
+        """
+        async with self._read_connection() as connection:
+            return await connection.fetch_columns(query, values, format=format)
+
     async def execute(
         self, query: typing.Union[ClauseElement, str], values: dict = None
     ) -> typing.Any:
-        async with self.connection() as connection:
-            return await connection.execute(query, values)
+        fast_connection = self._fast_connection(read=False)
+        if fast_connection is not None:
+            result = await self._run_fast(fast_connection, "execute", query, values)
+        else:
+            async with self.connection() as connection:
+                result = await connection.execute(query, values)
+        self._invalidate_results(query)
+        return result
 
     async def execute_many(
         self, query: typing.Union[ClauseElement, str], values: list
     ) -> None:
         async with self.connection() as connection:
-            return await connection.execute_many(query, values)
+            await connection.execute_many(query, values)
+        self._invalidate_results(query)
 
     async def iterate(
-        self, query: typing.Union[ClauseElement, str], values: dict = None
-    ) -> typing.AsyncGenerator[typing.Mapping, None]:
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        batch_size: int = None,
+        row_type: str = None,
+        model: typing.Callable = None,
+    ) -> typing.AsyncGenerator[typing.Any, None]:
+        async with self._read_connection() as connection:
+            records = connection.iterate(
+                query,
+                values,
+                batch_size=batch_size,
+                row_type=row_type or self.row_type,
+                model=model,
+            )
+            try:
+                async for record in records:
+                    yield record
+            finally:
+                await records.aclose()
+
+    async def iterate_batches(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        size: int = None,
+        row_type: str = None,
+        model: typing.Callable = None,
+    ) -> typing.AsyncGenerator[typing.List[typing.Any], None]:
+        async with self._read_connection() as connection:
+            batches = connection.iterate_batches(
+                query,
+                values,
+                size=size,
+                row_type=row_type or self.row_type,
+                model=model,
+            )
+            try:
+                async for batch in batches:
+                    yield batch
+            finally:
+                await batches.aclose()
+
+    async def explain(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        analyze: bool = False,
+    ) -> typing.List[str]:
         async with self.connection() as connection:
-            async for record in connection.iterate(query, values):
-                yield record
+            return await connection.explain(query, values, analyze=analyze)
+
+    async def copy_records(
+        self,
+        table: typing.Union[Table, str],
+        records: typing.Union[typing.Iterable, typing.AsyncIterable],
+        *,
+        columns: typing.Sequence[str] = None,
+    ) -> None:
+        async with self.connection() as connection:
+            await connection.copy_records(table, records, columns=columns)
+        if self.result_cache is not None:
+            name = table if isinstance(table, str) else table.name
+            self._invalidate_tables(frozenset([name]))
+
+    async def gather(
+        self,
+        *queries: typing.Union[ClauseElement, str, typing.Tuple],
+        max_concurrency: int = None,
+        row_type: str = None,
+    ) -> typing.List[typing.List[typing.Any]]:
+        """
+        Run independent read queries concurrently, each on its own connection
+        from the pool, and return the results of `fetch_all()` for each one
+        in order. Queries may be given either alone, or as `(query, values)`.
+        """
+        pairs = [
+            query if isinstance(query, tuple) else (query, None) for query in queries
+        ]
+        row_type = row_type or self.row_type
+
+        if self._in_transaction():
+            # Queries must see the transaction's changes, so run them in
+            # turn on the transaction's connection.
+            async with self.connection() as connection:
+                return [
+                    await connection.fetch_all(query, values, row_type=row_type)
+                    for query, values in pairs
+                ]
+
+        semaphore = asyncio.Semaphore(max_concurrency or len(pairs) or 1)
+
+        async def fetch_all(
+            query: typing.Union[ClauseElement, str], values: typing.Optional[dict]
+        ) -> typing.List[typing.Any]:
+            connection = self._replica_connection() or Connection(
+                self._backend, self.hooks
+            )
+            async with semaphore:
+                async with connection:
+                    return await connection.fetch_all(query, values, row_type=row_type)
+
+        # Every query is left to finish even if another fails, since a query
+        # that is cancelled part way through may leave its connection unusable.
+        results = await asyncio.gather(
+            *[fetch_all(query, values) for query, values in pairs],
+            return_exceptions=True,
+        )
+        rows = []  # type: typing.List[typing.List[typing.Any]]
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+            rows.append(result)
+        return rows
+
+    def prepare(self, query: typing.Union[ClauseElement, str]) -> "PreparedStatement":
+        """
+        Compile `query` once, returning a handle that runs it with just
+        the values for each call.
+        """
+        return PreparedStatement(self, query)
 
     def connection(self) -> "Connection":
         if self._global_connection is not None:
@@ -141,17 +354,183 @@ class Database:
         try:
             return self._connection_context.get()
         except LookupError:
-            connection = Connection(self._backend)
+            connection = Connection(self._backend, self.hooks)
             self._connection_context.set(connection)
             return connection
 
     def transaction(self, *, force_rollback: bool = False) -> "Transaction":
         return self.connection().transaction(force_rollback=force_rollback)
 
+    def pool_stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Return the size and acquire metrics of the connection pool, along
+        with those of each replica's pool, if there are any.
+        """
+        stats = self._backend.pool_stats()
+        if self._replicas:
+            stats["replicas"] = [
+                replica.backend.pool_stats() for replica in self._replicas
+            ]
+        return stats
+
+    def add_hook(self, name: str, hook: typing.Callable) -> None:
+        """
+        Register `hook` to be called on the `name` event, for every
+        connection made by the database.
+        """
+        self.hooks.add(name, hook)
+
+    def remove_hook(self, name: str, hook: typing.Callable) -> None:
+        self.hooks.remove(name, hook)
+
+    def use_primary(self) -> "UsePrimary":
+        """
+        Route all queries within a `with database.use_primary():` block to
+        the primary database, rather than to any replicas.
+        """
+        return UsePrimary(self._use_primary_context)
+
+    async def _fetch_cached(
+        self,
+        method: str,
+        query: typing.Union[ClauseElement, str],
+        values: typing.Optional[dict],
+        **kwargs: typing.Any,
+    ) -> typing.Any:
+        result_cache = self.result_cache
+        assert result_cache is not None, "No result cache is configured."
+
+        # Reads within a transaction may see uncommitted changes, so they
+        # are neither served from nor stored in the cache.
+        cache_key = None
+        statement = query  # type: typing.Any
+        if not self._in_transaction():
+            # The query is compiled just once, both for its key and to run it.
+            statement = self._backend.get_compiled(query, values)
+            cache_key = result_cache.get_key(
+                query, statement, values, method, *kwargs.items()
+            )
+        if cache_key is not None:
+            key, tables = cache_key
+            try:
+                return self._copy_models(result_cache.get(key), method, kwargs)
+            except KeyError:
+                pass
+            # A write that completes while the query runs may make its result
+            # stale, in which case it isn't stored.
+            generation = result_cache.get_generation(tables)
+
+        async with self._read_connection() as connection:
+            result = await getattr(connection, method)(statement, values, **kwargs)
+        if cache_key is not None:
+            result_cache.set(key, result, tables, generation)
+            return self._copy_models(result, method, kwargs)
+        return result
+
+    @staticmethod
+    def _copy_models(
+        result: typing.Any, method: str, kwargs: typing.Dict[str, typing.Any]
+    ) -> typing.Any:
+        # Rows are immutable, but models aren't, so each caller gets its own
+        # shallow copies rather than the instances held by the cache.
+        if kwargs.get("model") is None or result is None:
+            return result
+        elif method == "fetch_all":
+            return [copy.copy(instance) for instance in result]
+        return copy.copy(result)
+
+    def _fast_connection(self, read: bool) -> typing.Optional[ConnectionBackend]:
+        """
+        Return a backend connection for running a single query without the
+        locks and bookkeeping of a `Connection`, or `None` if the query must
+        go through the task's `Connection`.
+        """
+        if self._global_connection is not None or self.hooks.active:
+            return None
+        if read and self._replicas:
+            return None
+        # A task's connection that isn't in use holds no pool connection,
+        # so a query on a connection of its own behaves just the same. One
+        # that is in use may be within a transaction, or shared with other
+        # tasks, so its queries have to go through it.
+        connection = self._connection_context.get(None)
+        if connection is not None and connection._connection_counter:
+            return None
+        return self._backend.connection()
+
+    @staticmethod
+    async def _run_fast(
+        connection: ConnectionBackend, method: str, *args: typing.Any
+    ) -> typing.Any:
+        # The connection is private to this call, so nothing else can use
+        # it concurrently and it needs no locking.
+        await connection.acquire()
+        try:
+            return await getattr(connection, method)(*args)
+        finally:
+            await connection.release()
+
+    def _invalidate_results(self, query: typing.Union[ClauseElement, str]) -> None:
+        if self.result_cache is None:
+            return
+        # Raw SQL writes, or statements that don't name any tables, could
+        # touch anything.
+        tables = None if isinstance(query, str) else get_table_names(query)
+        self._invalidate_tables(tables or None)
+
+    def _invalidate_tables(self, tables: typing.Optional[frozenset]) -> None:
+        result_cache = self.result_cache
+        assert result_cache is not None
+        result_cache.invalidate(tables)
+        # Until the transaction commits, other tasks still read the old rows
+        # and may cache them, so the tables are invalidated again once the
+        # changes are visible.
+        connection = self._connection_context.get(None)
+        if connection is not None and connection._transaction_stack:
+            root = connection._transaction_stack[0]
+            root._on_commit[tables] = functools.partial(result_cache.invalidate, tables)
+
+    def _create_backend(self, url: "DatabaseURL") -> DatabaseBackend:
+        backend_str = self.SUPPORTED_BACKENDS[url.dialect]
+        backend_cls = import_from_string(backend_str)
+        assert issubclass(backend_cls, DatabaseBackend)
+        return backend_cls(url, **self.options)
+
+    def _read_connection(self) -> "Connection":
+        return self._replica_connection() or self.connection()
+
+    def _replica_connection(self) -> typing.Optional["ReplicaConnection"]:
+        if (
+            not self._replicas
+            or self._use_primary_context.get()
+            or self._in_transaction()
+        ):
+            return None
+
+        # Pick the faster of two randomly chosen replicas, which spreads load
+        # while steering it away from slow replicas.
+        if len(self._replicas) == 1:
+            replica = self._replicas[0]
+        else:
+            replica_1, replica_2 = random.sample(self._replicas, 2)
+            replica = min(replica_1, replica_2, key=lambda item: item.latency)
+        return ReplicaConnection(replica, self.hooks)
+
+    def _in_transaction(self) -> bool:
+        if self._global_connection is not None:
+            return True
+        connection = self._connection_context.get(None)
+        return connection is not None and bool(connection._transaction_stack)
+
+    @property
+    def compiled_cache(self) -> CompiledCache:
+        return self._backend.compiled_cache
+
 
 class Connection:
-    def __init__(self, backend: DatabaseBackend) -> None:
+    def __init__(self, backend: DatabaseBackend, hooks: Hooks = None) -> None:
         self._backend = backend
+        self._hooks = Hooks() if hooks is None else hooks
 
         self._connection_lock = asyncio.Lock()
         self._connection = self._backend.connection()
@@ -167,6 +546,8 @@ class Connection:
             self._connection_counter += 1
             if self._connection_counter == 1:
                 await self._connection.acquire()
+                if self._hooks.active:
+                    self._hooks.fire("on_acquire", self)
         return self
 
     async def __aexit__(
@@ -179,19 +560,39 @@ class Connection:
             assert self._connection is not None
             self._connection_counter -= 1
             if self._connection_counter == 0:
+                if self._hooks.active:
+                    self._hooks.fire("on_release", self)
                 await self._connection.release()
 
     async def fetch_all(
-        self, query: typing.Union[ClauseElement, str], values: dict = None
-    ) -> typing.List[typing.Mapping]:
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        row_type: RowType = "record",
+        model: typing.Callable = None,
+    ) -> typing.List[typing.Any]:
+        if model is not None:
+            row_type = model
+        if self._hooks.active:
+            return await self._run_hooked("fetch_all", query, values, row_type)
         async with self._query_lock:
-            return await self._connection.fetch_all(self._build_query(query, values))
+            return await self._connection.fetch_all(query, values, row_type)
 
     async def fetch_one(
-        self, query: typing.Union[ClauseElement, str], values: dict = None
-    ) -> typing.Optional[typing.Mapping]:
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        row_type: RowType = "record",
+        model: typing.Callable = None,
+    ) -> typing.Optional[typing.Any]:
+        if model is not None:
+            row_type = model
+        if self._hooks.active:
+            return await self._run_hooked("fetch_one", query, values, row_type)
         async with self._query_lock:
-            return await self._connection.fetch_one(self._build_query(query, values))
+            return await self._connection.fetch_one(query, values, row_type)
 
     async def fetch_val(
         self,
@@ -199,52 +600,367 @@ class Connection:
         values: dict = None,
         column: typing.Any = 0,
     ) -> typing.Any:
-        async with self._query_lock:
-            row = await self._connection.fetch_one(self._build_query(query, values))
+        row = await self.fetch_one(query, values)
         return None if row is None else row[column]
 
+    async def fetch_columns(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        format: str = "list",
+    ) -> typing.Any:
+        if self._hooks.active:
+            columns = await self._run_hooked("fetch_columns", query, values)
+        else:
+            async with self._query_lock:
+                columns = await self._connection.fetch_columns(query, values)
+        return convert_columns(columns, format)
+
     async def execute(
         self, query: typing.Union[ClauseElement, str], values: dict = None
     ) -> typing.Any:
+        if self._hooks.active:
+            return await self._run_hooked("execute", query, values)
         async with self._query_lock:
-            return await self._connection.execute(self._build_query(query, values))
+            return await self._connection.execute(query, values)
 
     async def execute_many(
         self, query: typing.Union[ClauseElement, str], values: list
     ) -> None:
-        queries = [self._build_query(query, values_set) for values_set in values]
+        if self._hooks.active:
+            await self._run_hooked("execute_many", query, values)
+            return
         async with self._query_lock:
-            await self._connection.execute_many(queries)
+            await self._connection.execute_many(query, values)
 
     async def iterate(
-        self, query: typing.Union[ClauseElement, str], values: dict = None
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        batch_size: int = None,
+        row_type: RowType = "record",
+        model: typing.Callable = None,
     ) -> typing.AsyncGenerator[typing.Any, None]:
+        # Rows are fetched from the backend in batches, so that there's only
+        # a single await per batch rather than per row.
+        batches = self.iterate_batches(
+            query, values, size=batch_size, row_type=row_type, model=model
+        )
+        try:
+            async for batch in batches:
+                for record in batch:
+                    yield record
+        finally:
+            # Breaking out of the loop leaves the batches suspended, still
+            # holding the query lock and transaction, until they're closed.
+            await batches.aclose()
+
+    async def iterate_batches(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        size: int = None,
+        row_type: RowType = "record",
+        model: typing.Callable = None,
+    ) -> typing.AsyncGenerator[typing.List[typing.Any], None]:
+        if model is not None:
+            row_type = model
         async with self.transaction():
             async with self._query_lock:
-                async for record in self._connection.iterate(
-                    self._build_query(query, values)
-                ):
-                    yield record
+                if not self._hooks.active:
+                    async for batch in self._connection.iterate_batches(
+                        query, values, size, row_type
+                    ):
+                        yield batch
+                    return
+
+                event = self._start_query("iterate", query, values)
+                event.rowcount = 0
+                try:
+                    async for batch in self._connection.iterate_batches(
+                        query, values, size, row_type
+                    ):
+                        event.rowcount += len(batch)
+                        yield batch
+                except Exception as exc:
+                    self._end_query(event, exc)
+                    raise
+                finally:
+                    # Also reached if the caller stops iterating early.
+                    if event.error is None:
+                        self._end_query(event)
+
+    async def copy_records(
+        self,
+        table: typing.Union[Table, str],
+        records: typing.Union[typing.Iterable, typing.AsyncIterable],
+        *,
+        columns: typing.Sequence[str] = None,
+    ) -> None:
+        if self._hooks.active:
+            await self._run_hooked("copy_records", table, records, columns)
+            return
+        async with self._query_lock:
+            await self._connection.copy_records(table, records, columns)
 
     def transaction(self, *, force_rollback: bool = False) -> "Transaction":
         return Transaction(self, force_rollback)
 
+    async def explain(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        analyze: bool = False,
+    ) -> typing.List[str]:
+        async with self._query_lock:
+            return await self._connection.explain(query, values, analyze)
+
+    async def _run_hooked(
+        self, method: str, query: typing.Any, values: typing.Any, *args: typing.Any
+    ) -> typing.Any:
+        event = self._start_query(method, query, values)
+        try:
+            async with self._query_lock:
+                result = await getattr(self._connection, method)(query, values, *args)
+        except Exception as exc:
+            self._end_query(event, exc)
+            raise
+        if method == "fetch_all":
+            event.rowcount = len(result)
+        elif method == "fetch_one":
+            event.rowcount = 0 if result is None else 1
+        elif method == "fetch_columns":
+            event.rowcount = len(next(iter(result.values()), []))
+        elif method == "execute_many":
+            event.rowcount = len(values)
+        self._end_query(event)
+        return result
+
+    def _start_query(
+        self, method: str, query: typing.Any, values: typing.Any
+    ) -> QueryEvent:
+        event = QueryEvent(self, method, query, values)
+        self._hooks.fire("before_query", event)
+        event._started = time.perf_counter()
+        return event
+
+    def _end_query(self, event: QueryEvent, error: Exception = None) -> None:
+        event.duration = time.perf_counter() - event._started
+        # The query has already finished, so a failing hook shouldn't change
+        # its outcome.
+        if error is None:
+            self._hooks.fire_logged("after_query", event)
+        else:
+            event.error = error
+            self._hooks.fire_logged("on_error", event)
+
     @property
     def raw_connection(self) -> typing.Any:
         return self._connection.raw_connection
 
-    @staticmethod
-    def _build_query(
-        query: typing.Union[ClauseElement, str], values: dict = None
-    ) -> ClauseElement:
-        if isinstance(query, str):
-            query = text(query)
 
-            return query.bindparams(**values) if values is not None else query
-        elif values:
-            return query.values(**values)
+class PreparedStatement:
+    def __init__(
+        self, database: Database, query: typing.Union[ClauseElement, str]
+    ) -> None:
+        self._database = database
+        self._query = query
+        # Statements such as `insert()` depend on the keys of the values
+        # given, so the query is compiled on first use for each set of keys.
+        # Replicas have their own backends, so it is also compiled separately
+        # for each backend that it runs on.
+        self._compiled = {}  # type: typing.Dict[tuple, typing.Any]
+
+    async def fetch_all(
+        self,
+        values: dict = None,
+        *,
+        row_type: str = None,
+        model: typing.Callable = None,
+    ) -> typing.List[typing.Any]:
+        async with self._database._read_connection() as connection:
+            return await connection.fetch_all(
+                self._compile(connection, values),
+                values,
+                row_type=row_type or self._database.row_type,
+                model=model,
+            )
+
+    async def fetch_one(
+        self,
+        values: dict = None,
+        *,
+        row_type: str = None,
+        model: typing.Callable = None,
+    ) -> typing.Optional[typing.Any]:
+        async with self._database._read_connection() as connection:
+            return await connection.fetch_one(
+                self._compile(connection, values),
+                values,
+                row_type=row_type or self._database.row_type,
+                model=model,
+            )
+
+    async def fetch_val(
+        self, values: dict = None, column: typing.Any = 0
+    ) -> typing.Any:
+        async with self._database._read_connection() as connection:
+            return await connection.fetch_val(
+                self._compile(connection, values), values, column=column
+            )
+
+    async def execute(self, values: dict = None) -> typing.Any:
+        async with self._database.connection() as connection:
+            result = await connection.execute(self._compile(connection, values), values)
+        self._database._invalidate_results(self._query)
+        return result
+
+    async def iterate(
+        self,
+        values: dict = None,
+        *,
+        batch_size: int = None,
+        row_type: str = None,
+        model: typing.Callable = None,
+    ) -> typing.AsyncGenerator[typing.Any, None]:
+        async with self._database._read_connection() as connection:
+            async for record in connection.iterate(
+                self._compile(connection, values),
+                values,
+                batch_size=batch_size,
+                row_type=row_type or self._database.row_type,
+                model=model,
+            ):
+                yield record
+
+    def _compile(
+        self, connection: Connection, values: typing.Optional[dict]
+    ) -> typing.Any:
+        column_keys = (
+            () if isinstance(self._query, str) else tuple(sorted(values or ()))
+        )
+        key = (connection._backend, column_keys)
+        try:
+            return self._compiled[key]
+        except KeyError:
+            compiled = connection._backend.prepare(
+                self._query, list(column_keys) or None
+            )
+            self._compiled[key] = compiled
+            return compiled
+
+
+class Replica:
+    # The weight given to each new sample in the moving average of latency.
+    LATENCY_DECAY = 0.2
+
+    def __init__(self, backend: DatabaseBackend) -> None:
+        self.backend = backend
+        self.latency = 0.0
+
+    def record_latency(self, elapsed: float) -> None:
+        if self.latency == 0.0:
+            self.latency = elapsed
+        else:
+            self.latency += self.LATENCY_DECAY * (elapsed - self.latency)
+
+
+class ReplicaConnection(Connection):
+    """
+    A connection to a replica, which records how long its queries take.
+
+    Only the time spent waiting on the database is recorded, and not the
+    time spent acquiring the connection or processing iterated rows, so that
+    a busy pool or a slow consumer doesn't make a replica look slow.
+    """
+
+    def __init__(self, replica: Replica, hooks: Hooks = None) -> None:
+        super().__init__(replica.backend, hooks)
+        self._replica = replica
+
+    async def fetch_all(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        row_type: RowType = "record",
+        model: typing.Callable = None,
+    ) -> typing.List[typing.Any]:
+        started = time.perf_counter()
+        result = await super().fetch_all(query, values, row_type=row_type, model=model)
+        self._replica.record_latency(time.perf_counter() - started)
+        return result
+
+    async def fetch_one(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        row_type: RowType = "record",
+        model: typing.Callable = None,
+    ) -> typing.Optional[typing.Any]:
+        started = time.perf_counter()
+        result = await super().fetch_one(query, values, row_type=row_type, model=model)
+        self._replica.record_latency(time.perf_counter() - started)
+        return result
+
+    async def fetch_columns(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        format: str = "list",
+    ) -> typing.Any:
+        started = time.perf_counter()
+        result = await super().fetch_columns(query, values, format=format)
+        self._replica.record_latency(time.perf_counter() - started)
+        return result
 
-        return query
+    async def iterate_batches(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        *,
+        size: int = None,
+        row_type: RowType = "record",
+        model: typing.Callable = None,
+    ) -> typing.AsyncGenerator[typing.List[typing.Any], None]:
+        # The time between batches is spent by the caller, so it's left out.
+        elapsed = 0.0
+        started = time.perf_counter()
+        batches = super().iterate_batches(
+            query, values, size=size, row_type=row_type, model=model
+        )
+        try:
+            async for batch in batches:
+                elapsed += time.perf_counter() - started
+                yield batch
+                started = time.perf_counter()
+        finally:
+            await batches.aclose()
+        elapsed += time.perf_counter() - started
+        self._replica.record_latency(elapsed)
+
+
+class UsePrimary:
+    def __init__(self, context: ContextVar) -> None:
+        self._context = context
+        self._tokens = []  # type: typing.List[typing.Any]
+
+    def __enter__(self) -> None:
+        self._tokens.append(self._context.set(True))
+
+    def __exit__(
+        self,
+        exc_type: typing.Type[BaseException] = None,
+        exc_value: BaseException = None,
+        traceback: TracebackType = None,
+    ) -> None:
+        self._context.reset(self._tokens.pop())
 
 
 class Transaction:
@@ -252,6 +968,8 @@ class Transaction:
         self._connection = connection
         self._force_rollback = force_rollback
         self._transaction = connection._connection.transaction()
+        # Callbacks to run once a root transaction has committed.
+        self._on_commit = {}  # type: typing.Dict[typing.Hashable, typing.Callable]
 
     async def __aenter__(self) -> "Transaction":
         """
@@ -298,6 +1016,8 @@ class Transaction:
             await self._connection.__aenter__()
             await self._transaction.start(is_root=is_root)
             self._connection._transaction_stack.append(self)
+        if self._connection._hooks.active:
+            self._connection._hooks.fire("on_transaction_start", self)
         return self
 
     async def commit(self) -> None:
@@ -306,6 +1026,11 @@ class Transaction:
             self._connection._transaction_stack.pop()
             await self._transaction.commit()
             await self._connection.__aexit__()
+        on_commit, self._on_commit = self._on_commit, {}
+        for callback in on_commit.values():
+            callback()
+        if self._connection._hooks.active:
+            self._connection._hooks.fire("on_transaction_end", self, True)
 
     async def rollback(self) -> None:
         async with self._connection._transaction_lock:
@@ -313,6 +1038,9 @@ class Transaction:
             self._connection._transaction_stack.pop()
             await self._transaction.rollback()
             await self._connection.__aexit__()
+        self._on_commit = {}
+        if self._connection._hooks.active:
+            self._connection._hooks.fire("on_transaction_end", self, False)
 
 
 class _EmptyNetloc(str):
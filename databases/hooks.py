@@ -0,0 +1,117 @@
+import logging
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from databases.core import Connection
+
+HOOK_NAMES = (
+    "before_query",
+    "after_query",
+    "on_error",
+    "on_acquire",
+    "on_release",
+    "on_transaction_start",
+    "on_transaction_end",
+)
+
+logger = logging.getLogger("databases")
+
+
+class Hooks:
+    """
+    The callbacks registered for each query lifecycle event.
+    """
+
+    def __init__(self) -> None:
+        self.active = False
+        self._hooks = {
+            name: [] for name in HOOK_NAMES
+        }  # type: typing.Dict[str, typing.List[typing.Callable]]
+
+    def add(self, name: str, hook: typing.Callable) -> None:
+        assert name in self._hooks, f"Unknown hook {name!r}"
+        self._hooks[name].append(hook)
+        self.active = True
+
+    def remove(self, name: str, hook: typing.Callable) -> None:
+        assert name in self._hooks, f"Unknown hook {name!r}"
+        self._hooks[name].remove(hook)
+        self.active = any(self._hooks.values())
+
+    def fire(self, name: str, *args: typing.Any) -> None:
+        for hook in self._hooks[name]:
+            hook(*args)
+
+    def fire_logged(self, name: str, *args: typing.Any) -> None:
+        """
+        Call the hooks for an event that has already happened, logging any
+        exceptions that they raise rather than raising them.
+        """
+        for hook in self._hooks[name]:
+            try:
+                hook(*args)
+            except Exception:
+                logger.exception("Error in %s hook %r", name, hook)
+
+
+class QueryEvent:
+    """
+    Details of a single query, passed to the query hooks.
+
+    The compiled SQL and parameters are only worked out if they are used.
+    """
+
+    __slots__ = (
+        "connection",
+        "method",
+        "query",
+        "values",
+        "duration",
+        "rowcount",
+        "error",
+        "_started",
+        "_compiled",
+    )
+
+    def __init__(
+        self,
+        connection: "Connection",
+        method: str,
+        query: typing.Any,
+        values: typing.Any,
+    ) -> None:
+        self.connection = connection
+        self.method = method
+        self.query = query
+        self.values = values
+        self.duration = None  # type: typing.Optional[float]
+        self.rowcount = None  # type: typing.Optional[int]
+        self.error = None  # type: typing.Optional[BaseException]
+        self._started = 0.0
+        self._compiled = None  # type: typing.Optional[typing.Tuple[str, typing.Any]]
+
+    @property
+    def sql(self) -> str:
+        return self._compile()[0]
+
+    @property
+    def params(self) -> typing.Any:
+        return self._compile()[1]
+
+    def _compile(self) -> typing.Tuple[str, typing.Any]:
+        if self._compiled is None:
+            backend = self.connection._connection
+            if self.method == "copy_records":
+                table = self.query
+                name = table if isinstance(table, str) else table.name
+                self._compiled = ("COPY " + name, None)
+            elif self.method == "execute_many":
+                # Each set of values is compiled separately.
+                compiled = [
+                    backend.compile(self.query, values) for values in self.values
+                ]
+                sql = compiled[0][0] if compiled else ""
+                self._compiled = (sql, [params for _, params in compiled])
+            else:
+                self._compiled = backend.compile(self.query, self.values)
+        return self._compiled
@@ -1,9 +1,23 @@
 import typing
 
+import sqlalchemy
+from sqlalchemy.engine.interfaces import Dialect
 from sqlalchemy.sql import ClauseElement
+from sqlalchemy.sql.schema import Table
+
+from databases.cache import CompiledCache
+from databases.rows import RowType
+from databases.stats import AcquireStats
+
+# The number of records inserted at a time by the `copy_records()` fallback.
+COPY_CHUNK_SIZE = 1000
 
 
 class DatabaseBackend:
+    compiled_cache: CompiledCache
+    acquire_stats: AcquireStats
+    _dialect: Dialect
+
     async def connect(self) -> None:
         raise NotImplementedError()  # pragma: no cover
 
@@ -13,6 +27,33 @@ class DatabaseBackend:
     def connection(self) -> "ConnectionBackend":
         raise NotImplementedError()  # pragma: no cover
 
+    def pool_stats(self) -> typing.Dict[str, typing.Any]:
+        """
+        Return the connection pool's size, idle and in-use connections, and
+        its acquire counts and wait times.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def get_compiled(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Any:
+        """
+        Return the compiled form of `query` for `values`, through the compiled
+        statement cache. It may be passed to the connection methods in place
+        of the original query.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def prepare(
+        self, query: typing.Union[ClauseElement, str], column_keys: list = None
+    ) -> typing.Any:
+        """
+        Compile `query` for values with the keys `column_keys`, returning a
+        compiled query that may be passed to the connection methods in place
+        of the original query.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
 
 class ConnectionBackend:
     async def acquire(self) -> None:
@@ -21,26 +62,120 @@ class ConnectionBackend:
     async def release(self) -> None:
         raise NotImplementedError()  # pragma: no cover
 
-    async def fetch_all(self, query: ClauseElement) -> typing.List[typing.Mapping]:
+    async def fetch_all(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        row_type: RowType = "record",
+    ) -> typing.List[typing.Any]:
+        raise NotImplementedError()  # pragma: no cover
+
+    async def fetch_one(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        row_type: RowType = "record",
+    ) -> typing.Optional[typing.Any]:
         raise NotImplementedError()  # pragma: no cover
 
-    async def fetch_one(self, query: ClauseElement) -> typing.Optional[typing.Mapping]:
+    async def fetch_columns(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Dict[str, list]:
+        """
+        Return the results as a list of values for each column, without
+        creating a mapping for each row.
+        """
         raise NotImplementedError()  # pragma: no cover
 
-    async def execute(self, query: ClauseElement) -> typing.Any:
+    async def execute(
+        self, query: typing.Union[ClauseElement, str], values: dict = None
+    ) -> typing.Any:
         raise NotImplementedError()  # pragma: no cover
 
-    async def execute_many(self, queries: typing.List[ClauseElement]) -> None:
+    async def execute_many(
+        self, query: typing.Union[ClauseElement, str], values: list
+    ) -> None:
         raise NotImplementedError()  # pragma: no cover
 
     async def iterate(
-        self, query: ClauseElement
-    ) -> typing.AsyncGenerator[typing.Mapping, None]:
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        batch_size: int = None,
+        row_type: RowType = "record",
+    ) -> typing.AsyncGenerator[typing.Any, None]:
+        async for batch in self.iterate_batches(query, values, batch_size, row_type):
+            for record in batch:
+                yield record
+
+    async def iterate_batches(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        size: int = None,
+        row_type: RowType = "record",
+    ) -> typing.AsyncGenerator[typing.List[typing.Any], None]:
         raise NotImplementedError()  # pragma: no cover
         # mypy needs async iterators to contain a `yield`
         # https://github.com/python/mypy/issues/5385#issuecomment-407281656
         yield True  # pragma: no cover
 
+    async def copy_records(
+        self,
+        table: typing.Union[Table, str],
+        records: typing.Union[typing.Iterable, typing.AsyncIterable],
+        columns: typing.Sequence[str] = None,
+    ) -> None:
+        """
+        Bulk load `records`, each a sequence of values in `columns` order.
+
+        Backends without a native bulk-load path fall back to inserting the
+        records in chunks with `execute_many()`.
+        """
+        if isinstance(table, str):
+            assert columns is not None, "columns are required for a table name"
+            table = sqlalchemy.table(table, *[sqlalchemy.column(c) for c in columns])
+        elif columns is None:
+            columns = [column.name for column in table.columns]
+
+        query = table.insert()
+        chunk = []  # type: typing.List[dict]
+        if isinstance(records, typing.AsyncIterable):
+            async for record in records:
+                chunk.append(dict(zip(columns, record)))
+                if len(chunk) >= COPY_CHUNK_SIZE:
+                    await self.execute_many(query, chunk)
+                    chunk = []
+        else:
+            for record in records:
+                chunk.append(dict(zip(columns, record)))
+                if len(chunk) >= COPY_CHUNK_SIZE:
+                    await self.execute_many(query, chunk)
+                    chunk = []
+        if chunk:
+            await self.execute_many(query, chunk)
+
+    async def explain(
+        self,
+        query: typing.Union[ClauseElement, str],
+        values: dict = None,
+        analyze: bool = False,
+    ) -> typing.List[str]:
+        """
+        Return the lines of the database's query plan for `query`. With
+        `analyze`, backends that support it run the query to collect
+        actual timings, and others log a warning and return the plan alone.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
+    def compile(
+        self, query: typing.Union[ClauseElement, str], values: typing.Any = None
+    ) -> typing.Tuple[str, typing.Any]:
+        """
+        Return the SQL and parameters that would be sent to the driver.
+        """
+        raise NotImplementedError()  # pragma: no cover
+
     def transaction(self) -> "TransactionBackend":
         raise NotImplementedError()  # pragma: no cover
 
@@ -0,0 +1,77 @@
+"""
+Parsing of raw SQL strings, for the backends' fast path that skips building
+and compiling a `text()` construct.
+"""
+
+import re
+import typing
+
+from sqlalchemy.engine.interfaces import Dialect
+from sqlalchemy.exc import ArgumentError, InvalidRequestError
+from sqlalchemy.sql.sqltypes import _resolve_value_to_type
+
+# The same rules as SQLAlchemy's `text()`: `:name` is a bind parameter,
+# except in `::casts`, and `\:` escapes a literal colon.
+BIND_PARAMS_RE = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+BIND_PARAMS_ESC_RE = re.compile(r"\\(:[\w\$]*)(?![:\w\$])")
+
+_bind_processors = {}  # type: dict
+
+
+class ParsedSQL:
+    """
+    A raw SQL string split into the text between its `:name` placeholders,
+    and the placeholder names, so that `len(chunks) == len(names) + 1`.
+    """
+
+    def __init__(self, sql: str) -> None:
+        parts = BIND_PARAMS_RE.split(sql)
+        self.chunks = [BIND_PARAMS_ESC_RE.sub(r"\1", part) for part in parts[::2]]
+        self.names = parts[1::2]
+        self.name_set = frozenset(self.names)
+
+    def render(self, placeholder: typing.Callable[[int, str], str]) -> str:
+        """
+        Return the SQL with the placeholder for each name, which is called
+        with the index of the placeholder and its name.
+        """
+        output = [self.chunks[0]]
+        for idx, (name, chunk) in enumerate(zip(self.names, self.chunks[1:])):
+            output.append(placeholder(idx, name))
+            output.append(chunk)
+        return "".join(output)
+
+
+def check_values(values: typing.Optional[dict], names: typing.AbstractSet) -> None:
+    """
+    Raise for any value without a placeholder in the SQL, as `text()`
+    does when binding it.
+    """
+    for key in values or ():
+        if key not in names:
+            raise ArgumentError(
+                "This text() construct doesn't define a bound parameter named %r" % key
+            )
+
+
+def get_value(values: typing.Optional[dict], name: str) -> typing.Any:
+    try:
+        return values[name]  # type: ignore
+    except (KeyError, TypeError):
+        raise InvalidRequestError(
+            "A value is required for bind parameter %r" % name
+        ) from None
+
+
+def process_value(dialect: Dialect, value: typing.Any) -> typing.Any:
+    """
+    Apply the bind processor for the SQLAlchemy type that `text()` would
+    infer from the value, which depends only on the value's Python type.
+    """
+    key = (dialect, type(value))
+    try:
+        processor = _bind_processors[key]
+    except KeyError:
+        datatype = _resolve_value_to_type(value)
+        processor = _bind_processors[key] = datatype._cached_bind_processor(dialect)
+    return value if processor is None else processor(value)
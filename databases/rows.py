@@ -0,0 +1,166 @@
+import dataclasses
+import functools
+import keyword
+import operator
+import typing
+
+# "record" rows are mappings with key and column access, "named" rows are
+# tuples that also support lookup by column name, "tuple" rows are plain
+# tuples of processed values, and "raw" rows are the driver's own rows
+# without any result processing.
+ROW_TYPES = ("record", "named", "tuple", "raw")
+
+# Backends are passed either one of `ROW_TYPES`, or a model to build each
+# row with.
+RowType = typing.Union[str, typing.Callable]
+
+
+class Row(tuple):
+    """
+    The base of the generated row classes. Rows are tuples of processed
+    values, that can also be looked up by column name, either as a key or,
+    where the name is a valid identifier, as an attribute.
+    """
+
+    __slots__ = ()
+    _fields = ()  # type: typing.Tuple[str, ...]
+    _index = {}  # type: typing.Dict[str, int]
+
+    def __getitem__(self, key: typing.Any) -> typing.Any:
+        if type(key) is str:
+            key = self._index[key]
+        return tuple.__getitem__(self, key)
+
+    def __repr__(self) -> str:
+        values = ", ".join(
+            "%s=%r" % (name, value) for name, value in zip(self._fields, self)
+        )
+        return "Row(%s)" % values
+
+    def __reduce__(self) -> tuple:
+        # The generated classes can't be found by name, so rows are pickled
+        # by their fields and values.
+        return (_rebuild_row, (self._fields, tuple(self)))
+
+    def keys(self) -> typing.List[str]:
+        return list(self._fields)
+
+    def values(self) -> typing.List[typing.Any]:
+        return list(self)
+
+    def items(self) -> typing.List[typing.Tuple[str, typing.Any]]:
+        return list(zip(self._fields, self))
+
+    def _asdict(self) -> typing.Dict[str, typing.Any]:
+        return dict(zip(self._fields, self))
+
+
+@functools.lru_cache(maxsize=1024)
+def get_row_class(fields: typing.Tuple[str, ...]) -> typing.Type[Row]:
+    """
+    Return the row class for results with the column names `fields`, which
+    is created once and shared by every statement with the same columns.
+    """
+    namespace = {
+        "__slots__": (),
+        "_fields": fields,
+        "_index": {name: idx for idx, name in enumerate(fields)},
+    }  # type: typing.Dict[str, typing.Any]
+    for idx, name in enumerate(fields):
+        if (
+            name.isidentifier()
+            and not keyword.iskeyword(name)
+            and not name.startswith("_")
+            and not hasattr(Row, name)
+        ):
+            namespace[name] = property(operator.itemgetter(idx))
+    return type("Row", (Row,), namespace)
+
+
+def _rebuild_row(fields: typing.Tuple[str, ...], values: tuple) -> Row:
+    return get_row_class(fields)(values)
+
+
+def get_model_fields(model: typing.Callable) -> typing.Optional[typing.Set[str]]:
+    """
+    Return the names of the fields that `model` is constructed with, for
+    dataclasses and pydantic models, or `None` if they aren't known.
+    """
+    if dataclasses.is_dataclass(model):
+        return {field.name for field in dataclasses.fields(model) if field.init}
+    fields = getattr(model, "model_fields", None) or getattr(model, "__fields__", None)
+    if isinstance(fields, dict):
+        return set(fields)
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def get_model_factory(
+    model: typing.Callable,
+    names: typing.Tuple[str, ...],
+    processors: typing.Tuple[typing.Optional[typing.Callable], ...],
+) -> typing.Callable[[typing.Any], typing.Any]:
+    """
+    Return a function that builds a `model` directly from a driver row with
+    the columns `names`, passing each column as the keyword argument of the
+    same name. Columns that aren't fields of a dataclass or pydantic model
+    are left out.
+    """
+    fields = get_model_fields(model)
+    # Later columns win over earlier ones with the same name.
+    columns = {
+        name: idx for idx, name in enumerate(names) if fields is None or name in fields
+    }
+
+    namespace = {"model": model}  # type: typing.Dict[str, typing.Any]
+    args, extra = [], []
+    for name, idx in columns.items():
+        value = "row[%d]" % idx
+        processor = processors[idx] if idx < len(processors) else None
+        if processor is not None:
+            namespace["process_%d" % idx] = processor
+            value = "process_%d(%s)" % (idx, value)
+        if name.isidentifier() and not keyword.iskeyword(name):
+            args.append("%s=%s" % (name, value))
+        else:
+            extra.append("%r: %s" % (name, value))
+    if extra:
+        args.append("**{%s}" % ", ".join(extra))
+
+    source = "def build(row):\n    return model(%s)\n" % ", ".join(args)
+    exec(source, namespace)
+    return namespace["build"]
+
+
+def make_rows(
+    rows: typing.Iterable[typing.Any],
+    processors: typing.Sequence[typing.Optional[typing.Callable]],
+    row_type: RowType,
+    names: typing.Sequence[str] = (),
+) -> list:
+    """
+    Return driver rows as "named", "tuple" or "raw" rows, or as instances
+    of a model, applying only the result processors of columns that have one.
+    """
+    if row_type == "raw":
+        return list(rows)
+    elif not isinstance(row_type, str):
+        build = get_model_factory(row_type, tuple(names), tuple(processors))
+        return [build(row) for row in rows]
+    assert row_type in ROW_TYPES, f"row_type must be one of {ROW_TYPES}"
+    row_class = tuple if row_type == "tuple" else get_row_class(tuple(names))
+
+    active = [
+        (idx, processor)
+        for idx, processor in enumerate(processors)
+        if processor is not None
+    ]
+    if not active:
+        return [row_class(row) for row in rows]
+    result = []
+    for row in rows:
+        values = list(row)
+        for idx, processor in active:
+            values[idx] = processor(values[idx])
+        result.append(row_class(values))
+    return result
@@ -0,0 +1,208 @@
+import asyncio
+import contextlib
+import logging
+import math
+import os
+import random
+import re
+import sys
+import time
+import typing
+from collections import OrderedDict
+
+from databases.hooks import QueryEvent
+
+logger = logging.getLogger("databases")
+
+# Frames from these locations are skipped when looking for the caller.
+SKIP_PATHS = (
+    os.path.dirname(os.path.abspath(__file__)),
+    os.path.dirname(os.path.abspath(asyncio.__file__)),
+    os.path.abspath(contextlib.__file__),
+)
+
+# Only queries that read are explained, since EXPLAIN ANALYZE runs them.
+EXPLAIN_METHODS = ("fetch_all", "fetch_one", "fetch_columns", "iterate", "execute")
+READ_QUERY_RE = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+
+LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+WHITESPACE_RE = re.compile(r"\s+")
+
+
+class SlowQueryLog:
+    """
+    Logs queries that take longer than `threshold` seconds, as an
+    `after_query` hook.
+
+    Each statement fingerprint is logged at most once per `interval`
+    seconds, with a count of the similar queries that were suppressed, and
+    at most `max_per_interval` slow queries are logged in each interval.
+    With `explain`, the query plan of a sample of slow reads is captured on a
+    separate connection and included in the log entry. Only one plan is
+    captured at a time, and slow reads while it is being captured are logged
+    without a plan, so that a burst of them can't exhaust the pool. With
+    `analyze`, the plan is captured by running the query again, on
+    PostgreSQL, MySQL 8.0.18+ and MariaDB. Other databases log a warning and
+    capture the plan alone.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 1.0,
+        *,
+        explain: bool = False,
+        analyze: bool = False,
+        sample_rate: float = 1.0,
+        redact: bool = True,
+        interval: float = 60.0,
+        max_per_interval: int = 100,
+        max_fingerprints: int = 1000,
+    ) -> None:
+        self.threshold = threshold
+        self.explain = explain
+        self.analyze = analyze
+        self.sample_rate = sample_rate
+        self.redact = redact
+        self.interval = interval
+        self.max_per_interval = max_per_interval
+        self.max_fingerprints = max_fingerprints
+        # The time each fingerprint was last logged, and the number of
+        # times it has been suppressed since.
+        self._fingerprints = OrderedDict()  # type: OrderedDict
+        self._window_start = -math.inf
+        self._window_count = 0
+        self._tasks = set()  # type: typing.Set[asyncio.Future]
+
+    def __call__(self, event: QueryEvent) -> None:
+        assert event.duration is not None
+        if event.duration < self.threshold:
+            return
+
+        fingerprint = get_fingerprint(event.sql)
+        suppressed = self._check_rate(fingerprint, time.monotonic())
+        if suppressed is None:
+            return
+
+        entry = {
+            "sql": event.sql,
+            "params": redact(event.params) if self.redact else event.params,
+            "duration": event.duration,
+            "location": get_caller(),
+            "fingerprint": fingerprint,
+            "suppressed": suppressed,
+            "plan": None,
+        }  # type: typing.Dict[str, typing.Any]
+
+        if (
+            self.explain
+            and not self._tasks
+            and event.method in EXPLAIN_METHODS
+            and READ_QUERY_RE.match(entry["sql"])
+            and random.random() < self.sample_rate
+        ):
+            task = asyncio.ensure_future(self._explain(event, entry))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        else:
+            self._log(entry)
+
+    async def wait(self) -> None:
+        """
+        Wait for any query plans that are still being captured.
+        """
+        if self._tasks:
+            await asyncio.wait(list(self._tasks))
+
+    def _check_rate(self, fingerprint: str, now: float) -> typing.Optional[int]:
+        """
+        Return the number of suppressed queries to report if this one should
+        be logged, or `None` if it should be suppressed.
+        """
+        if now - self._window_start >= self.interval:
+            self._window_start = now
+            self._window_count = 0
+
+        state = self._fingerprints.get(fingerprint)
+        if state is None:
+            state = self._fingerprints[fingerprint] = [-math.inf, 0]
+            if len(self._fingerprints) > self.max_fingerprints:
+                self._fingerprints.popitem(last=False)
+        self._fingerprints.move_to_end(fingerprint)
+
+        if (
+            now - state[0] < self.interval
+            or self._window_count >= self.max_per_interval
+        ):
+            state[1] += 1
+            return None
+
+        suppressed = state[1]
+        state[0], state[1] = now, 0
+        self._window_count += 1
+        return suppressed
+
+    async def _explain(
+        self, event: QueryEvent, entry: typing.Dict[str, typing.Any]
+    ) -> None:
+        from databases.core import Connection
+
+        # The query's own connection may be busy, or within a transaction,
+        # so the plan is captured on a fresh one.
+        connection = Connection(event.connection._backend)
+        try:
+            async with connection:
+                entry["plan"] = await connection.explain(
+                    event.query, event.values, analyze=self.analyze
+                )
+        except Exception:
+            logger.exception("Failed to explain slow query")
+        self._log(entry)
+
+    @staticmethod
+    def _log(entry: typing.Dict[str, typing.Any]) -> None:
+        message = "Slow query (%.3fs) at %s:\n%s\nParams: %r"
+        args = [entry["duration"], entry["location"], entry["sql"], entry["params"]]
+        if entry["suppressed"]:
+            message += "\n%d similar slow queries were suppressed"
+            args.append(entry["suppressed"])
+        if entry["plan"] is not None:
+            message += "\nPlan:\n%s"
+            args.append("\n".join(entry["plan"]))
+        logger.warning(message, *args, extra={"slow_query": entry})
+
+
+def get_fingerprint(sql: str) -> str:
+    """
+    Normalize `sql` so that statements differing only in literal values
+    share a fingerprint.
+    """
+    sql = LITERAL_RE.sub("?", sql)
+    return WHITESPACE_RE.sub(" ", sql).strip()
+
+
+def redact(params: typing.Any) -> typing.Any:
+    """
+    Replace each parameter with the name of its type.
+    """
+
+    def redact_value(value: typing.Any) -> typing.Any:
+        return None if value is None else f"<{type(value).__name__}>"
+
+    if isinstance(params, dict):
+        return {key: redact_value(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [redact_value(value) for value in params]
+    return params
+
+
+def get_caller() -> str:
+    """
+    Return the location of the innermost frame outside of this package.
+    """
+    frame = sys._getframe(1)  # type: typing.Any
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(SKIP_PATHS):
+            return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "<unknown>"
@@ -0,0 +1,66 @@
+import math
+import time
+import typing
+from collections import deque
+from types import TracebackType
+
+# The number of recent acquire wait times kept for percentiles.
+WAIT_SAMPLES = 1000
+
+
+class AcquireStats:
+    """
+    Counts of connection pool acquires, and the time spent waiting on them.
+    """
+
+    def __init__(self, samples: int = WAIT_SAMPLES) -> None:
+        self.acquires = 0
+        self.waiters = 0
+        self._waits = deque(maxlen=samples)  # type: typing.Deque[float]
+
+    def timer(self) -> "AcquireTimer":
+        """
+        Time an acquire, with `with stats.timer(): await pool.acquire()`.
+        """
+        return AcquireTimer(self)
+
+    def get_stats(self) -> typing.Dict[str, typing.Any]:
+        waits = sorted(self._waits)
+        return {
+            "waiters": self.waiters,
+            "acquires": self.acquires,
+            "acquire_wait_p50": self._percentile(waits, 50),
+            "acquire_wait_p90": self._percentile(waits, 90),
+            "acquire_wait_p99": self._percentile(waits, 99),
+            "acquire_wait_max": waits[-1] if waits else 0.0,
+        }
+
+    @staticmethod
+    def _percentile(waits: typing.List[float], percent: float) -> float:
+        # Nearest-rank percentile of the sorted wait times.
+        if not waits:
+            return 0.0
+        rank = math.ceil(percent / 100 * len(waits))
+        return waits[max(rank, 1) - 1]
+
+
+class AcquireTimer:
+    def __init__(self, stats: AcquireStats) -> None:
+        self._stats = stats
+        self._started = 0.0
+
+    def __enter__(self) -> None:
+        self._stats.waiters += 1
+        self._started = time.perf_counter()
+
+    def __exit__(
+        self,
+        exc_type: typing.Type[BaseException] = None,
+        exc_value: BaseException = None,
+        traceback: TracebackType = None,
+    ) -> None:
+        stats = self._stats
+        stats.waiters -= 1
+        if exc_type is None:
+            stats.acquires += 1
+            stats._waits.append(time.perf_counter() - self._started)
@@ -4,6 +4,7 @@ Unit tests for the backend connection arguments.
 
 from databases.backends.mysql import MySQLBackend
 from databases.backends.postgres import PostgresBackend
+from databases.backends.sqlite import SQLiteBackend
 
 
 def test_postgres_pool_size():
@@ -52,3 +53,15 @@ def test_mysql_explicit_ssl():
     backend = MySQLBackend("mysql://localhost/database", ssl=True)
     kwargs = backend._get_connection_kwargs()
     assert kwargs == {"ssl": True}
+
+
+def test_sqlite_pool_size():
+    backend = SQLiteBackend("sqlite:///test.db?min_size=1&max_size=20")
+    kwargs = backend._get_connection_kwargs()
+    assert kwargs == {"min_size": 1, "max_size": 20}
+
+
+def test_sqlite_explicit_pool_size():
+    backend = SQLiteBackend("sqlite:///test.db", min_size=1, max_size=20)
+    kwargs = backend._get_connection_kwargs()
+    assert kwargs == {"min_size": 1, "max_size": 20}
@@ -1,13 +1,20 @@
 import asyncio
+import dataclasses
 import datetime
 import decimal
 import functools
 import os
+import pickle
+from unittest import mock
 
 import pytest
 import sqlalchemy
 
-from databases import Database, DatabaseURL
+from databases import Database, DatabaseURL, ResultCache, Row, SlowQueryLog
+from databases.cache import CompiledCache
+from databases.core import Connection, ReplicaConnection
+from databases.rows import get_model_factory
+from databases.slow_queries import get_caller, get_fingerprint, redact
 
 assert "TEST_DATABASE_URLS" in os.environ, "TEST_DATABASE_URLS is not set."
 
@@ -752,6 +759,41 @@ async def test_concurrent_access_on_single_connection(database_url):
         await asyncio.gather(db_lookup(), db_lookup())
 
 
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_single_query_fast_path(database_url):
+    """
+    Test that single queries outside of a connection block run on a pool
+    connection of their own, and that queries within one still share it.
+    """
+    async with Database(database_url) as database:
+        try:
+            await database.execute(notes.insert(), {"text": "a", "completed": True})
+            assert await database.fetch_val("SELECT COUNT(*) FROM notes") == 1
+            results = await database.fetch_all(notes.select())
+            assert [result["text"] for result in results] == ["a"]
+            result = await database.fetch_one(notes.select(), row_type="tuple")
+            assert result[1:] == ("a", True)
+            assert database._connection_context.get(None) is None
+            assert database.pool_stats()["acquires"] == 4
+
+            async with database.connection() as connection:
+                await database.fetch_one(notes.select())
+                assert database.pool_stats()["acquires"] == 5
+                assert connection._connection_counter == 1
+
+            # The task's connection is idle again, so queries skip it.
+            await database.fetch_one(notes.select())
+            assert database.pool_stats()["acquires"] == 6
+
+            async with database.transaction():
+                await database.execute(notes.insert(), {"text": "b", "completed": True})
+                assert await database.fetch_val("SELECT COUNT(*) FROM notes") == 2
+                assert database.pool_stats()["acquires"] == 7
+        finally:
+            await database.execute(notes.delete())
+
+
 @pytest.mark.parametrize("database_url", DATABASE_URLS)
 @async_adapter
 async def test_iterate_outside_transaction_with_values(database_url):
@@ -824,3 +866,1521 @@ async def test_column_names(database_url, select_query):
             assert sorted(results[0].keys()) == ["completed", "id", "text"]
             assert results[0]["text"] == "example1"
             assert results[0]["completed"] == True
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_compiled_cache(database_url):
+    """
+    Test that statements are compiled once and reused for differing values.
+    """
+    async with Database(database_url, compiled_cache_size=2) as database:
+        async with database.transaction(force_rollback=True):
+            cache = database.compiled_cache
+
+            # Constructs are stored once they are compiled a second time.
+            query = notes.insert()
+            for idx in range(3):
+                values = {"text": "example%d" % idx, "completed": True}
+                await database.execute(query, values)
+            assert cache.misses == 2
+            assert cache.hits == 1
+
+            query = notes.select().where(notes.c.text == sqlalchemy.bindparam("text"))
+            for text in ("example1", "example2", "example1"):
+                result = await database.fetch_one(query, values={"text": text})
+                assert result["text"] == text
+            assert cache.misses == 4
+            assert cache.hits == 2
+
+            query = "SELECT * FROM notes WHERE text = :text"
+            result = await database.fetch_one(query, values={"text": "example0"})
+            assert result["text"] == "example0"
+            assert cache.misses == 5
+            assert cache.evictions == 1
+            assert len(cache) == 2
+            assert cache.stats() == {
+                "size": 2,
+                "maxsize": 2,
+                "hits": 2,
+                "misses": 5,
+                "evictions": 1,
+            }
+
+            # Constructs built for each call are never stored.
+            cache.clear()
+            for idx in range(3):
+                query = notes.select().where(notes.c.id == idx)
+                await database.fetch_one(query)
+            assert len(cache) == 0
+
+            # Except for those run by `execute_many()`, which reuses them.
+            await database.execute_many(notes.insert(), [values] * 3)
+            assert len(cache) == 1
+
+
+def test_compiled_cache_stats():
+    """
+    Test the hits and misses from compiling the same construct repeatedly,
+    and that statements with SQL expression values are never stored.
+    """
+    compiler = mock.Mock(side_effect=lambda clause, column_keys: column_keys)
+    compiled_cache = CompiledCache(maxsize=10)
+    query = notes.insert()
+    for _ in range(4):
+        column_keys = compiled_cache.compile(
+            query, {"text": "example", "completed": True}, compiler
+        )
+        assert column_keys == ["completed", "text"]
+    assert compiler.call_count == 2
+    assert compiled_cache.stats() == {
+        "size": 1,
+        "maxsize": 10,
+        "hits": 2,
+        "misses": 2,
+        "evictions": 0,
+    }
+
+    values = {"text": sqlalchemy.func.lower("EXAMPLE"), "completed": True}
+    for _ in range(2):
+        assert compiled_cache.compile(query, values, compiler, reused=True) is None
+    assert compiled_cache.stats()["misses"] == 4
+    assert len(compiled_cache) == 1
+
+    # A cache with a `maxsize` of zero stores nothing.
+    compiled_cache = CompiledCache(maxsize=0)
+    for _ in range(2):
+        compiled_cache.compile(query, None, compiler, reused=True)
+    assert compiled_cache.stats()["misses"] == 2
+    assert len(compiled_cache) == 0
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_unconsumed_column_names(database_url):
+    """
+    Test that values which a statement doesn't use are rejected, rather than
+    silently dropped.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            with pytest.raises(sqlalchemy.exc.CompileError, match="txt"):
+                await database.execute(
+                    notes.insert(), {"txt": "typo", "completed": True}
+                )
+
+            query = notes.update().where(notes.c.id == 1)
+            with pytest.raises(sqlalchemy.exc.CompileError, match="txt"):
+                await database.execute(query, {"txt": "typo"})
+
+            assert await database.fetch_all(notes.select()) == []
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_raw_query_parsing(database_url):
+    """
+    Test that raw queries are parsed once, with repeated and escaped
+    placeholders, and without compiling a `text()` construct.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            cache = database.compiled_cache
+            query = "INSERT INTO notes(text, completed) VALUES (:text, :completed)"
+            for idx in range(3):
+                values = {"text": "50%% done:%d" % idx, "completed": True}
+                await database.execute(query, values)
+            assert cache.misses == 1
+            assert cache.hits == 2
+
+            query = (
+                "SELECT text, :text AS label FROM notes "
+                "WHERE text = :text OR text = '\\:text'"
+            )
+            results = await database.fetch_all(query, values={"text": "50% done:1"})
+            assert [tuple(result.values()) for result in results] == [
+                ("50% done:1", "50% done:1")
+            ]
+
+            with pytest.raises(sqlalchemy.exc.InvalidRequestError):
+                await database.fetch_all(query, values={})
+
+            # As with `text()`, values without a placeholder are an error.
+            with pytest.raises(sqlalchemy.exc.ArgumentError, match="txt"):
+                await database.fetch_all(
+                    query, values={"text": "50% done:1", "txt": "50% done:1"}
+                )
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_sqlite_connection_pool(database_url):
+    """
+    Test that SQLite connections are reused, reset on release, and reaped
+    once they have been idle for too long.
+    """
+    database_url = DatabaseURL(database_url)
+    if database_url.dialect != "sqlite":
+        pytest.skip("Test is specific to the SQLite connection pool")
+
+    async with Database(database_url, min_size=1, max_size=2) as database:
+        async with database.connection() as connection:
+            raw_connection = connection.raw_connection
+            await raw_connection.execute("BEGIN")
+            await database.execute(notes.insert(), {"text": "a", "completed": True})
+        assert not raw_connection.in_transaction
+
+        async with database.connection() as connection:
+            assert connection.raw_connection is raw_connection
+            assert await database.fetch_all(notes.select()) == []
+
+    async with Database(
+        database_url, min_size=0, max_inactive_connection_lifetime=0.01
+    ) as database:
+        pool = database._backend._pool
+
+        async def query():
+            async with database.connection() as connection:
+                await connection.fetch_all(notes.select())
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(query(), query())
+        assert pool._size == 2
+        await asyncio.sleep(0.02)
+        async with database.connection():
+            assert pool._size == 1
+
+    # Closing the pool closes the connections that are still in use, and
+    # releasing them afterwards is a no-op.
+    database = Database(database_url, min_size=1)
+    await database.connect()
+    pool = database._backend._pool
+    connection = database.connection()
+    await connection.__aenter__()
+    await database.disconnect()
+    assert pool._size == 0
+    await connection.__aexit__()
+
+    # A query cancelled while it's running leaves its cursor open, so its
+    # connection is closed rather than reused, releasing the database lock.
+    async with Database(database_url, min_size=1, max_size=2, timeout=1) as database:
+        pool = database._backend._pool
+        values = [{"text": "example%d" % idx, "completed": True} for idx in range(10)]
+        await database.execute_many(notes.insert(), values)
+        try:
+            task = asyncio.ensure_future(database.fetch_all(notes.select()))
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert pool._size == 0
+
+            # The same goes for a query cancelled while fetching its rows.
+            fetching = asyncio.Event()
+
+            async def fetchall(cursor):
+                fetching.set()
+                await asyncio.Event().wait()
+
+            with mock.patch("aiosqlite.Cursor.fetchall", fetchall):
+                task = asyncio.ensure_future(database.fetch_all(notes.select()))
+                await fetching.wait()
+                task.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+            assert pool._size == 0
+        finally:
+            await database.execute(notes.delete())
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_execute_many_with_differing_values(database_url):
+    """
+    Test `execute_many()` with value sets that don't all share the same keys.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = [
+                {"text": "example1", "completed": True},
+                {"text": "example2", "completed": False},
+                {"text": "example3"},
+                {"text": "example4", "completed": True},
+            ]
+            await database.execute_many(query, values)
+
+            query = notes.select().order_by(notes.c.id)
+            results = await database.fetch_all(query=query)
+            assert [result["text"] for result in results] == [
+                "example1",
+                "example2",
+                "example3",
+                "example4",
+            ]
+            assert results[2]["completed"] is None
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_execute_many_batches_with_executemany(database_url):
+    """
+    Test that consecutive value sets sharing a statement are sent through
+    asyncpg's `executemany` as a single batch.
+    """
+    database_url = DatabaseURL(database_url)
+    if database_url.dialect != "postgresql":
+        pytest.skip("Test is specific to asyncpg's `executemany`")
+
+    async with Database(database_url) as database:
+        async with database.connection() as connection:
+            async with connection.transaction(force_rollback=True):
+                proxy_class = type(connection.raw_connection)
+                executemany = proxy_class.executemany
+                batch_sizes = []
+
+                async def counting_executemany(self, command, args, **kwargs):
+                    args = list(args)
+                    batch_sizes.append(len(args))
+                    return await executemany(self, command, args, **kwargs)
+
+                values = [
+                    {"text": "example1", "completed": True},
+                    {"text": "example2", "completed": False},
+                    {"text": "example3"},
+                    {"text": "example4", "completed": True},
+                ]
+                with mock.patch.object(
+                    proxy_class, "executemany", counting_executemany
+                ):
+                    await connection.execute_many(notes.insert(), values)
+
+                assert batch_sizes == [2, 1, 1]
+                results = await connection.fetch_all(notes.select())
+                assert len(results) == 4
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_execute_many_multi_row_insert(database_url):
+    """
+    Test that MySQL's multi-row INSERTs are split to fit `max_allowed_packet`,
+    and that other statements are still applied row by row.
+    """
+    database_url = DatabaseURL(database_url)
+    if database_url.dialect != "mysql":
+        pytest.skip("Test is specific to aiomysql's multi-row INSERTs")
+
+    async with Database(database_url) as database:
+        async with database.connection() as connection:
+            async with connection.transaction(force_rollback=True):
+                cursor_class = connection.raw_connection.cursorclass
+                execute = cursor_class.execute
+                statements = []
+
+                async def counting_execute(self, query, args=None):
+                    statements.append(
+                        query.encode() if isinstance(query, str) else bytes(query)
+                    )
+                    return await execute(self, query, args)
+
+                values = [
+                    {"text": "example%d" % idx, "completed": idx % 2 == 0}
+                    for idx in range(20)
+                ]
+                # Leave 256 bytes for each multi-row statement.
+                database._backend._max_allowed_packet = 1024 + 256
+                with mock.patch.object(cursor_class, "execute", counting_execute):
+                    await connection.execute_many(notes.insert(), values)
+
+                inserts = [stmt for stmt in statements if stmt.startswith(b"INSERT")]
+                assert len(inserts) > 1
+                assert all(len(stmt) <= 256 for stmt in inserts)
+
+                query = notes.select().order_by(notes.c.id)
+                results = await connection.fetch_all(query)
+                assert [result["text"] for result in results] == [
+                    value["text"] for value in values
+                ]
+
+                query = (
+                    notes.update()
+                    .where(notes.c.text == sqlalchemy.bindparam("old_text"))
+                    .values(completed=sqlalchemy.bindparam("new_completed"))
+                )
+                await connection.execute_many(
+                    query,
+                    [
+                        {"old_text": value["text"], "new_completed": True}
+                        for value in values
+                    ],
+                )
+                query = notes.select().where(notes.c.completed == True)
+                results = await connection.fetch_all(query)
+                assert len(results) == 20
+
+
+@async_adapter
+async def test_execute_many_mysql_batches():
+    """
+    Test that MySQL's `execute_many()` sends consecutive value sets sharing
+    a statement through a single `executemany` call, limited to fit the
+    server's `max_allowed_packet`. Runs without a MySQL server.
+    """
+    from databases.backends.mysql import MySQLBackend
+
+    calls = []
+
+    class Cursor:
+        max_stmt_length = None
+
+        async def executemany(self, query, args):
+            calls.append((query, len(args), self.max_stmt_length))
+
+        async def close(self):
+            pass
+
+    class RawConnection:
+        async def cursor(self):
+            return Cursor()
+
+    backend = MySQLBackend("mysql://localhost/example")
+    backend._max_allowed_packet = 4096
+    connection = backend.connection()
+    connection._connection = RawConnection()
+    values = [
+        {"text": "example1", "completed": True},
+        {"text": "example2", "completed": False},
+        {"text": "example3"},
+        {"text": "example4", "completed": True},
+    ]
+    await connection.execute_many(notes.insert(), values)
+
+    assert [(size, length) for _, size, length in calls] == [
+        (2, 3072),
+        (1, 3072),
+        (1, 3072),
+    ]
+    assert calls[0][0].startswith("INSERT INTO notes")
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_execute_many_outside_transaction(database_url):
+    """
+    Test that `execute_many()` commits when used outside of a transaction.
+    """
+    async with Database(database_url) as database:
+        try:
+            query = "INSERT INTO notes(text, completed) VALUES (:text, :completed)"
+            values = [
+                {"text": "example1", "completed": True},
+                {"text": "example2", "completed": False},
+            ]
+            await database.execute_many(query, values)
+
+            async with Database(database_url) as other_database:
+                results = await other_database.fetch_all(notes.select())
+                assert len(results) == 2
+        finally:
+            await database.execute(notes.delete())
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@pytest.mark.parametrize("select_query", [notes.select(), "SELECT * FROM notes"])
+@async_adapter
+async def test_record_views(database_url, select_query):
+    """
+    Test that `keys()`, `values()` and `items()` agree with key access,
+    for both SQLAlchemy core and raw queries.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = {"text": "example1", "completed": True}
+            await database.execute(query, values)
+
+            result = await database.fetch_one(query=select_query)
+            assert list(result.keys()) == ["id", "text", "completed"]
+            assert list(result.values()) == [result[key] for key in result.keys()]
+            assert list(result.items()) == list(zip(result.keys(), result.values()))
+            assert result[1] == "example1"
+
+            query = "SELECT text FROM notes"
+            assert await database.fetch_val(query=query) == "example1"
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_result_metadata_is_reused(database_url):
+    """
+    Test that repeated queries share their result metadata between calls.
+    """
+    database_url = DatabaseURL(database_url)
+    if database_url.dialect == "postgresql":
+        pytest.skip("Test is specific to SQLAlchemy's `RowProxy`")
+
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = {"text": "example1", "completed": True}
+            await database.execute(query, values)
+
+            # The statement is cached from its second use onwards.
+            query = notes.select()
+            await database.fetch_one(query=query)
+            result_1 = await database.fetch_one(query=query)
+            result_2 = await database.fetch_one(query=query)
+            assert result_1._parent is result_2._parent
+            assert result_2["text"] == "example1"
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_copy_records(database_url):
+    """
+    Test bulk loading records from both iterables and async iterables.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            records = [("example1", True), ("example2", False)]
+            await database.copy_records(notes, records, columns=["text", "completed"])
+
+            async def more_records():
+                for idx in range(3, 6):
+                    yield ("example%d" % idx, True)
+
+            await database.copy_records(
+                "notes", more_records(), columns=["text", "completed"]
+            )
+
+            query = notes.select().order_by(notes.c.id)
+            results = await database.fetch_all(query=query)
+            assert [result["text"] for result in results] == [
+                "example1",
+                "example2",
+                "example3",
+                "example4",
+                "example5",
+            ]
+            assert results[1]["completed"] == False
+
+            today = datetime.date.today()
+            records = [("Hello, world", today)]
+            await database.copy_records(
+                custom_date, records, columns=["title", "published"]
+            )
+            results = await database.fetch_all(query=custom_date.select())
+            assert results[0]["published"] == today
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_copy_records_chunks(database_url):
+    """
+    Test that backends without a native bulk load insert the records in
+    chunks, taking the columns from the table if they aren't given.
+    """
+    database_url = DatabaseURL(database_url)
+    if database_url.dialect == "postgresql":
+        pytest.skip("Test is specific to the `execute_many()` fallback")
+
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            connection = database.connection()._connection
+            execute_many = mock.patch.object(
+                connection, "execute_many", side_effect=connection.execute_many
+            )
+            with mock.patch("databases.interfaces.COPY_CHUNK_SIZE", 2):
+                with execute_many as spy:
+                    records = [(idx, "example%d" % idx, True) for idx in range(1, 4)]
+                    await database.copy_records(notes, records)
+
+                    async def more_records():
+                        for idx in range(4, 8):
+                            yield (idx, "example%d" % idx, False)
+
+                    await database.copy_records(notes, more_records())
+            chunks = [len(call[0][1]) for call in spy.call_args_list]
+            assert chunks == [2, 1, 2, 2]
+
+            query = notes.select().order_by(notes.c.id)
+            results = await database.fetch_all(query=query)
+            assert [result["text"] for result in results] == [
+                "example%d" % idx for idx in range(1, 8)
+            ]
+            assert [result["completed"] for result in results[2:4]] == [True, False]
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_iterate_batches(database_url):
+    """
+    Test `iterate()` with an explicit `batch_size`, and `iterate_batches()`.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = [
+                {"text": "example%d" % idx, "completed": True} for idx in range(5)
+            ]
+            await database.execute_many(query, values)
+
+            query = notes.select().order_by(notes.c.id)
+            results = []
+            async for result in database.iterate(query=query, batch_size=2):
+                results.append(result["text"])
+            assert results == ["example%d" % idx for idx in range(5)]
+
+            batches = []
+            async for batch in database.iterate_batches(query=query, size=2):
+                batches.append([result["text"] for result in batch])
+            assert batches == [
+                ["example0", "example1"],
+                ["example2", "example3"],
+                ["example4"],
+            ]
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_iterate_early_break(database_url):
+    """
+    Test that the connection is still usable after breaking out of `iterate()`.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = [
+                {"text": "example%d" % idx, "completed": True} for idx in range(5)
+            ]
+            await database.execute_many(query, values)
+
+            query = notes.select()
+            iterator = database.iterate(query=query, batch_size=2)
+            async for result in iterator:
+                break
+            await iterator.aclose()
+
+            results = await database.fetch_all(query=query)
+            assert len(results) == 5
+
+    # The same goes for breaking out of a replica's batches.
+    async with Database(database_url, replicas=[database_url]) as database:
+        try:
+            await database.execute_many(notes.insert(), values)
+            iterator = database.iterate_batches(query=notes.select(), size=2)
+            async for batch in iterator:
+                break
+            await iterator.aclose()
+
+            results = await database.fetch_all(query=notes.select())
+            assert len(results) == 5
+        finally:
+            await database.execute(notes.delete())
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_gather(database_url):
+    """
+    Test running read queries concurrently with `gather()`, both on separate
+    connections and within a transaction.
+    """
+    async with Database(database_url) as database:
+        try:
+            query = notes.insert()
+            values = [
+                {"text": "example%d" % idx, "completed": True} for idx in range(3)
+            ]
+            await database.execute_many(query, values)
+
+            select = notes.select().where(notes.c.text == sqlalchemy.bindparam("text"))
+            all_notes, example1, example2 = await database.gather(
+                notes.select(),
+                (select, {"text": "example1"}),
+                ("SELECT * FROM notes WHERE text = :text", {"text": "example2"}),
+                max_concurrency=2,
+            )
+            assert len(all_notes) == 3
+            assert example1[0]["text"] == "example1"
+            assert example2[0]["text"] == "example2"
+
+            async with database.transaction(force_rollback=True):
+                await database.execute(notes.delete())
+                (results,) = await database.gather(notes.select())
+                assert results == []
+
+            # A failing query leaves the others to finish before `gather()`
+            # raises, rather than cancelling them part way through.
+            finished = []
+            database.add_hook("after_query", finished.append)
+            queries = [notes.select()] * 4 + ["SELECT * FROM missing"]
+            with pytest.raises(Exception):
+                await database.gather(*queries)
+            database.remove_hook("after_query", finished.append)
+            assert len(finished) == 4
+            assert database.pool_stats()["in_use"] == 0
+        finally:
+            await database.execute(notes.delete())
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_read_replicas(database_url):
+    """
+    Test that reads are routed to replicas outside of transactions, and to
+    the primary inside transactions or a `use_primary()` block.
+    """
+    async with Database(database_url, replicas=[database_url]) as database:
+        replica = database._replicas[0]
+        try:
+            query = notes.insert()
+            values = {"text": "example1", "completed": True}
+            await database.execute(query, values)
+
+            result = await database.fetch_one(notes.select())
+            assert result["text"] == "example1"
+            assert replica.latency > 0
+
+            replica.latency = 0.0
+            with database.use_primary():
+                assert await database.fetch_val(notes.select()) is not None
+            async with database.transaction():
+                assert len(await database.fetch_all(notes.select())) == 1
+            assert replica.latency == 0.0
+
+            async for result in database.iterate(notes.select()):
+                assert result["text"] == "example1"
+            assert replica.latency > 0
+
+            # Check which connection served each kind of read.
+            for method in ("fetch_all", "fetch_columns"):
+                with mock.patch.object(
+                    Connection,
+                    method,
+                    autospec=True,
+                    side_effect=getattr(Connection, method),
+                ) as spy:
+                    await getattr(database, method)(notes.select())
+                    with database.use_primary():
+                        await getattr(database, method)(notes.select())
+                served = [call[0][0] for call in spy.call_args_list]
+                assert isinstance(served[0], ReplicaConnection)
+                assert served[0]._replica is replica
+                assert not isinstance(served[1], ReplicaConnection)
+        finally:
+            await database.execute(notes.delete())
+
+    # Latency is a moving average, and the faster of two replicas is used.
+    async with Database(database_url, replicas=[database_url] * 2) as database:
+        slow, fast = database._replicas
+        slow.record_latency(1.0)
+        slow.record_latency(2.0)
+        assert slow.latency == pytest.approx(1.2)
+        fast.latency = 0.1
+        for _ in range(5):
+            assert database._replica_connection()._replica is fast
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_prepare(database_url):
+    """
+    Test prepared statement handles, for both SQLAlchemy constructs and raw
+    queries.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            insert = database.prepare(notes.insert())
+            for idx in range(3):
+                await insert.execute({"text": "example%d" % idx, "completed": True})
+
+            select = database.prepare(
+                notes.select().where(notes.c.text == sqlalchemy.bindparam("text"))
+            )
+            result = await select.fetch_one({"text": "example1"})
+            assert result["text"] == "example1"
+            assert result["completed"] is True
+            assert await select.fetch_all({"text": "example2"}) != []
+            assert await select.fetch_one({"text": "missing"}) is None
+            assert await select.fetch_val({"text": "example0"}, column=1) == "example0"
+
+            count = database.prepare("SELECT COUNT(*) FROM notes")
+            assert await count.fetch_val() == 3
+
+            # Raw queries process their values by type, as they do unprepared.
+            published = datetime.datetime(2019, 1, 1, 12, 30)
+            await database.execute(
+                articles.insert(), {"title": "example", "published": published}
+            )
+            query = "SELECT title FROM articles WHERE published = :published"
+            results = await database.fetch_all(query, {"published": published})
+            assert [result["title"] for result in results] == ["example"]
+            results = await database.prepare(query).fetch_all({"published": published})
+            assert [result["title"] for result in results] == ["example"]
+
+            update = database.prepare(
+                notes.update().where(notes.c.text == sqlalchemy.bindparam("old_text"))
+            )
+            await update.execute({"old_text": "example2", "completed": False})
+            assert await select.fetch_val({"text": "example2"}, column=2) is False
+
+            results = [
+                record async for record in database.prepare(notes.select()).iterate()
+            ]
+            assert [result["text"] for result in results] == [
+                "example0",
+                "example1",
+                "example2",
+            ]
+
+        # Statements are reused across separate acquires of the connection.
+        count = database.prepare("SELECT COUNT(*) FROM notes")
+        select = database.prepare(notes.select())
+        for _ in range(2):
+            assert await count.fetch_val() == 0
+            assert await select.fetch_all() == []
+            assert await database.fetch_one(notes.select()) is None
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_result_cache(database_url):
+    """
+    Test that cached reads are served from the result cache, and invalidated
+    by writes to the tables that they read.
+    """
+    result_cache = ResultCache(maxsize=10)
+    async with Database(database_url, result_cache=result_cache) as database:
+        try:
+            await database.execute(
+                notes.insert(), {"text": "example1", "completed": True}
+            )
+
+            query = notes.select()
+            results = await database.fetch_all(query, cache=True)
+            assert len(results) == 1
+            assert await database.fetch_all(query, cache=True) == results
+            assert result_cache.hits == 1
+            assert result_cache.bytes > 0
+
+            # Keys are built through the compiled statement cache, so hits on
+            # a statement that is already cached don't compile it again.
+            misses = database.compiled_cache.misses
+            assert await database.fetch_all(query, cache=True) == results
+            assert database.compiled_cache.misses == misses
+
+            # Uncached reads, and reads of other tables, are unaffected.
+            assert len(await database.fetch_all(query)) == 1
+            await database.fetch_val("SELECT COUNT(*) FROM notes", cache=True)
+            await database.fetch_one(
+                articles.select().where(articles.c.title == "missing"), cache=True
+            )
+            assert len(result_cache) == 3
+
+            # Writes to the table invalidate its results, and any untagged ones.
+            await database.execute(
+                notes.insert(), {"text": "example2", "completed": False}
+            )
+            assert len(result_cache) == 1
+            assert len(await database.fetch_all(query, cache=True)) == 2
+            assert (
+                await database.fetch_val("SELECT COUNT(*) FROM notes", cache=True) == 2
+            )
+
+            # Raw SQL writes invalidate everything.
+            await database.execute(
+                "DELETE FROM notes WHERE completed = :completed", {"completed": False}
+            )
+            assert len(result_cache) == 0
+
+            # Results are keyed by their bound parameters.
+            select = notes.select().where(notes.c.text == sqlalchemy.bindparam("text"))
+            result = await database.fetch_one(select, {"text": "example1"}, cache=True)
+            assert result["text"] == "example1"
+            assert (
+                await database.fetch_one(select, {"text": "example2"}, cache=True)
+                is None
+            )
+
+            # Reads within transactions bypass the cache.
+            async with database.transaction():
+                await database.fetch_all(query, cache=True)
+            assert len(result_cache) == 2
+
+            # Columns that don't belong to a table are left out of the tags.
+            query = sqlalchemy.select([sqlalchemy.func.count()]).select_from(notes)
+            assert await database.fetch_val(query, cache=True) == 1
+            query = sqlalchemy.select([sqlalchemy.literal_column("1")])
+            assert await database.fetch_val(query, cache=True) == 1
+
+            # Models are mutable, so each read gets copies of its own.
+            query = notes.select()
+            for _ in range(2):
+                results = await database.fetch_all(query, model=Note, cache=True)
+                assert results[0].text == "example1"
+                results[0].text = "changed"
+                result = await database.fetch_one(query, model=Note, cache=True)
+                assert result.text == "example1"
+                result.text = "changed"
+            for _ in range(2):
+                result = await database.fetch_one(
+                    select, {"text": "missing"}, model=Note, cache=True
+                )
+                assert result is None
+        finally:
+            await database.execute(notes.delete())
+
+
+def test_result_cache_expiry_and_eviction():
+    """
+    Test that cached results expire after their TTL, and that the least
+    recently used are evicted to stay within `max_bytes`.
+    """
+    result_cache = ResultCache(ttl=10.0)
+    with mock.patch("databases.cache.time.monotonic", return_value=100.0):
+        result_cache.set("key", ["old"], None)
+        result_cache.set("key", ["result"], None)
+        assert len(result_cache) == 1
+        assert result_cache.get("key") == ["result"]
+    with mock.patch("databases.cache.time.monotonic", return_value=111.0):
+        with pytest.raises(KeyError):
+            result_cache.get("key")
+    assert len(result_cache) == 0
+    assert result_cache.bytes == 0
+
+    size = ResultCache._get_size(["x" * 100])
+    result_cache = ResultCache(max_bytes=size * 2)
+    result_cache.set("a", ["a" * 100], frozenset(["notes"]))
+    result_cache.set("b", ["b" * 100], frozenset(["notes"]))
+    result_cache.get("a")
+    result_cache.set("c", ["c" * 100], frozenset(["notes"]))
+    assert result_cache.bytes <= size * 2
+    with pytest.raises(KeyError):
+        result_cache.get("b")
+
+    # Results larger than `max_bytes` aren't cached at all.
+    result_cache.set("d", ["d" * 1000], None)
+    with pytest.raises(KeyError):
+        result_cache.get("d")
+
+    assert result_cache.stats() == {
+        "size": 2,
+        "maxsize": 1000,
+        "bytes": size * 2,
+        "max_bytes": size * 2,
+        "hits": 1,
+        "misses": 2,
+        "evictions": 1,
+        "invalidations": 0,
+    }
+    result_cache.invalidate(["notes"])
+    assert result_cache.stats()["invalidations"] == 2
+    assert result_cache.stats()["size"] == 0
+
+    # Results with unhashable parameters can't be cached.
+    compiled = mock.Mock(query="SELECT :value", get_args=lambda values: [[1]])
+    assert result_cache.get_key("SELECT :value", compiled, {"value": [1]}) is None
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_result_cache_write_during_read(database_url):
+    """
+    Test that the result of a read isn't cached if a write to the tables
+    that it reads completes while it runs.
+    """
+    result_cache = ResultCache()
+    async with Database(database_url, result_cache=result_cache) as database:
+        try:
+            fetch_all = Connection.fetch_all
+
+            async def fetch_all_then_write(self, *args, **kwargs):
+                result = await fetch_all(self, *args, **kwargs)
+                await database.execute(
+                    notes.insert(), {"text": "example1", "completed": True}
+                )
+                return result
+
+            with mock.patch.object(Connection, "fetch_all", fetch_all_then_write):
+                assert await database.fetch_all(notes.select(), cache=True) == []
+            assert len(result_cache) == 0
+
+            results = await database.fetch_all(notes.select(), cache=True)
+            assert len(results) == 1
+            assert len(result_cache) == 1
+        finally:
+            await database.execute(notes.delete())
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_result_cache_invalidated_on_commit(database_url):
+    """
+    Test that results cached by other tasks while a write is uncommitted
+    are invalidated once it commits.
+    """
+    result_cache = ResultCache()
+    async with Database(database_url, result_cache=result_cache) as database:
+        try:
+            await database.execute(notes.insert(), {"text": "old", "completed": True})
+            updated = asyncio.Event()
+            read = asyncio.Event()
+
+            async def write():
+                async with database.transaction():
+                    await database.execute(notes.update(), {"text": "new"})
+                    updated.set()
+                    await read.wait()
+
+            task = asyncio.ensure_future(write())
+            await updated.wait()
+            query = sqlalchemy.select([notes.c.text])
+            results = await database.fetch_all(query, cache=True)
+            assert [result["text"] for result in results] == ["old"]
+
+            read.set()
+            await task
+            results = await database.fetch_all(query, cache=True)
+            assert [result["text"] for result in results] == ["new"]
+        finally:
+            await database.execute(notes.delete())
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_hooks(database_url, caplog):
+    """
+    Test that query lifecycle hooks fire for queries, connections and
+    transactions, with the details of each query.
+    """
+    events = []
+
+    def record(name):
+        return lambda *args: events.append((name,) + args)
+
+    async with Database(database_url) as database:
+        for name in ("before_query", "after_query", "on_error", "on_acquire"):
+            database.add_hook(name, record(name))
+        transaction_end = record("on_transaction_end")
+        database.add_hook("on_transaction_end", transaction_end)
+
+        async with database.transaction(force_rollback=True):
+            await database.execute(
+                notes.insert(), {"text": "example1", "completed": True}
+            )
+            results = await database.fetch_all(notes.select())
+            assert len(results) == 1
+        assert [event[0] for event in events] == [
+            "on_acquire",
+            "before_query",
+            "after_query",
+            "before_query",
+            "after_query",
+            "on_transaction_end",
+        ]
+        query_event = events[-2][1]
+        assert query_event.method == "fetch_all"
+        assert query_event.rowcount == 1
+        assert query_event.duration >= 0
+        assert "notes" in query_event.sql.lower()
+        assert query_event.error is None
+        assert events[-1][2] is False
+
+        events.clear()
+        with pytest.raises(Exception):
+            await database.fetch_all("SELECT * FROM missing_table")
+        assert events[-1][0] == "on_error"
+        assert events[-1][1].error is not None
+
+        events.clear()
+        database.remove_hook("on_transaction_end", transaction_end)
+        async with database.transaction():
+            async for result in database.iterate(notes.select()):
+                pass
+        assert events[-1][0] == "after_query"
+        assert events[-1][1].method == "iterate"
+        assert events[-1][1].rowcount == 0
+
+        # A failing `after_query` hook is logged, and doesn't fail the query.
+        def fail(event):
+            raise RuntimeError("Hook failed")
+
+        database.add_hook("after_query", fail)
+        with caplog.at_level("ERROR", logger="databases"):
+            assert await database.fetch_val("SELECT 1") == 1
+        database.remove_hook("after_query", fail)
+        assert "Error in after_query hook" in caplog.records[-1].getMessage()
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_hooks_query_methods(database_url):
+    """
+    Test that query hooks report the SQL and values of bulk, streaming and
+    columnar queries.
+    """
+    events = []
+    errors = []
+
+    async with Database(database_url) as database:
+        database.add_hook("before_query", events.append)
+        database.add_hook("on_error", errors.append)
+        async with database.transaction(force_rollback=True):
+            values = [
+                {"text": "example%d" % idx, "completed": True} for idx in range(2)
+            ]
+            await database.execute_many(notes.insert(), values)
+            records = [("example2", False)]
+            await database.copy_records(notes, records, columns=["text", "completed"])
+            query = notes.select().where(
+                notes.c.completed == sqlalchemy.bindparam("completed")
+            )
+            results = [
+                result async for result in database.iterate(query, {"completed": True})
+            ]
+            assert len(results) == 2
+            sql = "SELECT text FROM notes WHERE completed = "
+            columns = await database.fetch_columns(
+                sql + ":completed", {"completed": False}
+            )
+            assert columns == {"text": ["example2"]}
+
+        assert [event.method for event in events] == [
+            "execute_many",
+            "copy_records",
+            "iterate",
+            "fetch_columns",
+        ]
+        execute_many, copy_records, iterate, fetch_columns = events
+        assert execute_many.sql.lower().startswith("insert into notes")
+        assert execute_many.values == values
+        assert len(execute_many.params) == 2
+        assert execute_many.rowcount == 2
+        assert copy_records.sql == "COPY notes"
+        assert copy_records.values == records
+        assert copy_records.params is None
+        assert "where" in iterate.sql.lower()
+        assert iterate.values == {"completed": True}
+        assert iterate.rowcount == 2
+        assert fetch_columns.sql.startswith(sql)
+        assert fetch_columns.values == {"completed": False}
+        assert fetch_columns.rowcount == 1
+        assert errors == []
+
+        # An iteration that fails is reported as an error.
+        with pytest.raises(Exception):
+            async for result in database.iterate("SELECT * FROM missing_table"):
+                pass  # pragma: no cover
+        assert errors[-1].method == "iterate"
+        assert errors[-1].error is not None
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_pool_stats(database_url):
+    """
+    Test that pool statistics report connections in use and acquire waits.
+    """
+    async with Database(database_url) as database:
+        stats = database.pool_stats()
+        assert stats["in_use"] == 0
+        assert stats["acquires"] == 0
+
+        async with database.connection():
+            stats = database.pool_stats()
+            assert stats["size"] >= 1
+            assert stats["in_use"] == 1
+            assert stats["idle"] == stats["size"] - 1
+            assert stats["waiters"] == 0
+
+        await database.gather(notes.select(), notes.select())
+        stats = database.pool_stats()
+        assert stats["in_use"] == 0
+        assert stats["acquires"] == 3
+        assert 0 <= stats["acquire_wait_p50"] <= stats["acquire_wait_max"]
+    assert database.pool_stats()["size"] == 0
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_slow_query_log(database_url, caplog):
+    """
+    Test that slow queries are logged with their plans, and that repeats of
+    the same statement are suppressed.
+    """
+    slow_query_log = SlowQueryLog(threshold=0.0, explain=True)
+    async with Database(database_url, slow_query_log=slow_query_log) as database:
+        with caplog.at_level("WARNING", logger="databases"):
+            for idx in range(3):
+                await database.fetch_all(
+                    notes.select().where(notes.c.text == "example%d" % idx)
+                )
+            await database.execute(notes.delete())
+            await slow_query_log.wait()
+
+        entries = [record.slow_query for record in caplog.records]
+        assert len(entries) == 2
+        delete, select = sorted(entries, key=lambda entry: entry["sql"])
+        assert select["params"] == ["<str>"] or select["params"] == {"text_1": "<str>"}
+        assert select["location"].startswith(__file__)
+        assert select["plan"]
+        assert delete["plan"] is None
+
+        with caplog.at_level("WARNING", logger="databases"):
+            slow_query_log.interval = 0.0
+            await database.fetch_all(notes.select().where(notes.c.text == "example"))
+            await slow_query_log.wait()
+        assert caplog.records[-1].slow_query["suppressed"] == 2
+
+    async with Database(database_url) as database:
+        plan = await database.explain(notes.select())
+        assert plan
+
+        if DatabaseURL(database_url).dialect == "sqlite":
+            with caplog.at_level("WARNING", logger="databases"):
+                assert await database.explain(notes.select(), analyze=True) == plan
+            assert "can't analyze" in caplog.records[-1].getMessage()
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_slow_query_log_explain(database_url, caplog):
+    """
+    Test that slow queries are logged without a plan if it can't be
+    captured, or if another plan is still being captured.
+    """
+    slow_query_log = SlowQueryLog(threshold=0.0, explain=True, max_fingerprints=1)
+    async with Database(database_url, slow_query_log=slow_query_log) as database:
+        first = notes.select().where(notes.c.text == "example")
+        second = notes.select().where(notes.c.completed == True)
+        third = notes.select().where(notes.c.id == 1)
+
+        async def fail(*args, **kwargs):
+            raise RuntimeError("Explain failed")
+
+        with caplog.at_level("WARNING", logger="databases"):
+            with mock.patch.object(Connection, "explain", side_effect=fail):
+                await database.fetch_all(first)
+                await slow_query_log.wait()
+        assert caplog.records[-2].getMessage() == "Failed to explain slow query"
+        assert caplog.records[-1].slow_query["plan"] is None
+
+        release = asyncio.Event()
+
+        async def wait_for_release(*args, **kwargs):
+            await release.wait()
+            return ["plan"]
+
+        caplog.clear()
+        with caplog.at_level("WARNING", logger="databases"):
+            with mock.patch.object(Connection, "explain", side_effect=wait_for_release):
+                await database.fetch_all(second)
+                await database.fetch_all(third)
+                assert len(caplog.records) == 1
+                assert caplog.records[0].slow_query["plan"] is None
+                release.set()
+                await slow_query_log.wait()
+                # Only the latest fingerprint is kept, so the first query is
+                # logged again rather than suppressed.
+                await database.fetch_all(first)
+                await slow_query_log.wait()
+
+        entries = [record.slow_query for record in caplog.records]
+        assert [entry["plan"] for entry in entries] == [None, ["plan"], ["plan"]]
+        assert "id" in entries[0]["sql"]
+        assert "completed" in entries[1]["sql"]
+        assert "text" in entries[2]["sql"]
+
+
+def test_slow_query_log_formatting():
+    """
+    Test the threshold, fingerprints, parameter redaction and caller lookup
+    of the slow query log.
+    """
+    # Queries under the threshold aren't compiled or logged.
+    SlowQueryLog(threshold=1.0)(mock.Mock(spec=["duration"], duration=0.5))
+
+    sql = "SELECT *  FROM notes WHERE id = 1 AND text = 'it''s'"
+    assert get_fingerprint(sql) == "SELECT * FROM notes WHERE id = ? AND text = ?"
+
+    assert redact({"id": 1, "text": None}) == {"id": "<int>", "text": None}
+    assert redact((1, "text")) == ["<int>", "<str>"]
+    assert redact(None) is None
+
+    assert get_caller().startswith(__file__)
+    with mock.patch("databases.slow_queries.SKIP_PATHS", ("",)):
+        assert get_caller() == "<unknown>"
+
+
+def test_mysql_explain_analyze_version():
+    """
+    Test that MySQL only analyzes reads, on server versions that support it.
+    """
+    from databases.backends.mysql import MySQLBackend
+
+    class RawConnection:
+        def __init__(self, server_version):
+            self.server_version = server_version
+
+        def get_server_info(self):
+            return self.server_version
+
+    connection = MySQLBackend("mysql://localhost/example").connection()
+    query = "SELECT * FROM notes"
+    for server_version, prefix in [
+        ("8.0.32", "EXPLAIN ANALYZE "),
+        ("8.0.17", "EXPLAIN "),
+        ("5.7.40-log", "EXPLAIN "),
+        ("5.5.5-10.5.8-MariaDB", "ANALYZE "),
+    ]:
+        connection._connection = RawConnection(server_version)
+        assert connection._get_explain_prefix(query, analyze=True) == prefix
+        assert connection._get_explain_prefix(query, analyze=False) == "EXPLAIN "
+    assert connection._get_explain_prefix("DELETE FROM notes", True) == "EXPLAIN "
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_fetch_columns(database_url):
+    """
+    Test fetching results as columns, for SQLAlchemy and raw queries.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = [
+                {"text": "example%d" % idx, "completed": idx % 2 == 0}
+                for idx in range(3)
+            ]
+            await database.execute_many(query, values)
+
+            query = notes.select().order_by(notes.c.id)
+            columns = await database.fetch_columns(query)
+            assert list(columns) == ["id", "text", "completed"]
+            assert columns["text"] == ["example0", "example1", "example2"]
+            assert columns["completed"] == [True, False, True]
+
+            query = "SELECT text FROM notes WHERE completed = :completed ORDER BY id"
+            columns = await database.fetch_columns(query, {"completed": True})
+            assert columns == {"text": ["example0", "example2"]}
+
+            query = notes.select().where(notes.c.text == "missing")
+            columns = await database.fetch_columns(query)
+            assert columns == {"id": [], "text": [], "completed": []}
+
+            query = sqlalchemy.select([notes.c.id])
+            with pytest.raises(AssertionError):
+                await database.fetch_columns(query, format="unknown")
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_row_types(database_url):
+    """
+    Test returning rows as processed tuples, or as the driver's own rows.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = [
+                {"text": "example%d" % idx, "completed": idx % 2 == 0}
+                for idx in range(2)
+            ]
+            await database.execute_many(query, values)
+
+            query = sqlalchemy.select([notes.c.text, notes.c.completed]).order_by(
+                notes.c.id
+            )
+            results = await database.fetch_all(query, row_type="tuple")
+            assert results == [("example0", True), ("example1", False)]
+            assert all(type(result) is tuple for result in results)
+            with pytest.raises(TypeError):
+                results[0]["text"]
+
+            result = await database.fetch_one(query, row_type="tuple")
+            assert result == ("example0", True)
+
+            results = [row async for row in database.iterate(query, row_type="tuple")]
+            assert results == [("example0", True), ("example1", False)]
+
+            results = await database.fetch_all(query, row_type="raw")
+            assert [tuple(result)[0] for result in results] == ["example0", "example1"]
+
+            query = "SELECT text FROM notes WHERE text = :text"
+            result = await database.fetch_one(
+                query, values={"text": "example1"}, row_type="tuple"
+            )
+            assert result == ("example1",)
+
+            with pytest.raises(AssertionError):
+                await database.fetch_all(query, {"text": "example1"}, row_type="dict")
+
+    with pytest.raises(AssertionError):
+        Database(database_url, row_type="dict")
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_named_rows(database_url):
+    """
+    Test returning rows as generated named tuples, which are shared by
+    results with the same columns.
+    """
+    async with Database(database_url, row_type="named") as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = [
+                {"text": "example%d" % idx, "completed": idx % 2 == 0}
+                for idx in range(2)
+            ]
+            await database.execute_many(query, values)
+
+            query = sqlalchemy.select([notes.c.text, notes.c.completed]).order_by(
+                notes.c.id
+            )
+            results = await database.fetch_all(query)
+            assert results == [("example0", True), ("example1", False)]
+            result = results[0]
+            assert isinstance(result, Row)
+            assert result.text == result["text"] == result[0] == "example0"
+            assert result.completed is True
+            assert result.keys() == ["text", "completed"]
+            assert result.values() == ["example0", True]
+            assert result.items() == [("text", "example0"), ("completed", True)]
+            assert result._asdict() == {"text": "example0", "completed": True}
+            assert repr(result) == "Row(text='example0', completed=True)"
+            assert pickle.loads(pickle.dumps(result)) == result
+            assert not hasattr(result, "__dict__")
+            with pytest.raises(KeyError):
+                result["missing"]
+
+            query = "SELECT text, completed FROM notes ORDER BY id"
+            result = await database.fetch_one(query)
+            assert type(result) is type(results[0])
+            assert result.text == "example0"
+
+            query = "SELECT text, completed AS count FROM notes ORDER BY id"
+            async for result in database.iterate(query):
+                assert result["count"] == result[1]
+                assert callable(result.count)
+
+    async with Database(database_url, row_type="tuple") as database:
+        async with database.transaction(force_rollback=True):
+            await database.execute(notes.insert(), {"text": "a", "completed": True})
+            results = await database.fetch_all("SELECT text FROM notes")
+            assert results == [("a",)]
+            results = await database.fetch_all(
+                "SELECT text FROM notes", row_type="record"
+            )
+            assert results[0]["text"] == "a"
+
+
+@dataclasses.dataclass
+class Note:
+    text: str
+    completed: bool
+    id: int = 0
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_model_rows(database_url):
+    """
+    Test building models directly from the driver's rows.
+    """
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = [
+                {"text": "example%d" % idx, "completed": idx % 2 == 0}
+                for idx in range(2)
+            ]
+            await database.execute_many(query, values)
+
+            query = notes.select().order_by(notes.c.id)
+            results = await database.fetch_all(query, model=Note)
+            assert [(note.text, note.completed) for note in results] == [
+                ("example0", True),
+                ("example1", False),
+            ]
+            assert all(note.id > 0 for note in results)
+
+            # Columns that aren't fields are left out, and fields that
+            # aren't columns keep their defaults.
+            query = sqlalchemy.select(
+                [
+                    notes.c.text,
+                    notes.c.completed,
+                    sqlalchemy.literal_column("1").label("extra"),
+                ]
+            ).order_by(notes.c.id)
+            result = await database.fetch_one(query, model=Note)
+            assert result == Note(text="example0", completed=True)
+
+            query = "SELECT text FROM notes ORDER BY id"
+            results = [row async for row in database.iterate(query, model=dict)]
+            assert results == [{"text": "example0"}, {"text": "example1"}]
+
+            query = "SELECT text FROM notes WHERE text = :text"
+            result = await database.fetch_one(query, {"text": "missing"}, model=Note)
+            assert result is None
+
+
+def test_model_factory():
+    """
+    Test building pydantic-style models, which declare their fields in
+    `__fields__`, and passing columns whose names aren't identifiers.
+    """
+
+    class Model:
+        __fields__ = {"text": None, "class": None, "note text": None}
+
+        def __init__(self, **kwargs):
+            self.kwargs = kwargs
+
+    names = ("id", "text", "class", "note text")
+    build = get_model_factory(Model, names, (None, str.upper))
+    model = build((1, "a", "b", "c"))
+    assert model.kwargs == {"text": "A", "class": "b", "note text": "c"}
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_fetch_columns_numpy(database_url):
+    """
+    Test fetching columns as NumPy arrays.
+    """
+    numpy = pytest.importorskip("numpy")
+
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = {"text": "example1", "completed": True}
+            await database.execute(query, values)
+
+            columns = await database.fetch_columns(notes.select(), format="numpy")
+            assert isinstance(columns["id"], numpy.ndarray)
+            assert columns["text"].tolist() == ["example1"]
+
+
+@pytest.mark.parametrize("database_url", DATABASE_URLS)
+@async_adapter
+async def test_fetch_columns_arrow(database_url):
+    """
+    Test fetching columns as a pyarrow table.
+    """
+    pyarrow = pytest.importorskip("pyarrow")
+
+    async with Database(database_url) as database:
+        async with database.transaction(force_rollback=True):
+            query = notes.insert()
+            values = {"text": "example1", "completed": True}
+            await database.execute(query, values)
+
+            table = await database.fetch_columns(notes.select(), format="arrow")
+            assert isinstance(table, pyarrow.Table)
+            assert table.column_names == ["id", "text", "completed"]
+            assert table.to_pydict()["text"] == ["example1"]
+            assert table.to_pydict()["completed"] == [True]